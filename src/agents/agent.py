@@ -2,11 +2,14 @@
 """
 import random
 
-from utils.env_utils import get_verdict
 from agents.inferential_theory import InferentialTheory, random_inferential_theory_generator
-from agents.move import MoveType
+from agents.move import MoveType, sorted_moves
 from agents.msf import MSF
-from env.stage import Stage, initial_next_stage_2
+from agents.minimax import minimax_moves
+from agents.mcts import mcts_search
+from agents.scoring import new_commitments
+from env.stage import Stage, verdict_after
+from env.transpositions import TranspositionTable
 
 import pdb
 
@@ -16,13 +19,19 @@ class Agent():
     """
     class for an action-taking agent
     """
-    def __init__(self, msf, policy_name="random", inferential_theory_name="random", target="random", proposal="undeclared", goal="argue_for") -> None:
+    def __init__(self, msf, policy_name="random", inferential_theory_name="random", target="random", proposal="undeclared", goal="argue_for", policy_kwargs=None) -> None:
         self.msf = msf
-        self.valid_policy_names = ["random", "minimize_ac", "one_step_ahead"]
+        self.valid_policy_names = ["random", "minimize_ac", "one_step_ahead", "minimax", "mcts"]
         if policy_name in self.valid_policy_names:
             self.policy_name = policy_name
         else:
             raise ValueError(f"Error: Agent policy must be one of {self.valid_policy_names}.")
+        # Parameters of the policy, e.g. {'max_depth': 6, 'time_budget': 0.5} for minimax, see agents.minimax.
+        self.policy_kwargs = dict(policy_kwargs) if policy_kwargs is not None else dict()
+        # The state cache of minimax, made only for minimax agents, and the search tree of mcts, kept for the whole
+        # inquiry.
+        self.search_table = TranspositionTable() if self.policy_name == 'minimax' else None
+        self.search_tree = None
 
         self.valid_inferential_theory_names = ["default", "random"]
         self.inferential_theory_name = inferential_theory_name
@@ -72,21 +81,18 @@ class Agent():
         """
         # Input statement as a string, e.g. 'a_2'
         if argue_for_or_against == "argue_for":
-            move_set = frame.for_move
+            move_by_conc = frame.for_move_by_conc
         elif argue_for_or_against == "argue_against":
-            move_set = cl_inferential_theory.against_move
+            move_by_conc = cl_inferential_theory.against_move_by_conc
 
-        pool = []
-        for i in move_set:
-            if i.conc == frame.lang.index(statement):
-                pool.append(i)
+        pool = list(move_by_conc.get(frame.lang.index(statement), ()))
 
         if argue_for_or_against == "argue_for":
             move_sample_set = frozenset.intersection(frozenset(pool), cl_inferential_theory.for_move)
         elif argue_for_or_against == "argue_against":
             move_sample_set = pool
 
-        move = random.sample(move_sample_set, 1)[0]
+        move = random.choice(sorted_moves(move_sample_set))
         return move
 
     def _first_move_random_move(self, cl_inferential_theory: InferentialTheory, argue_for_or_against: str ="argue_for"):
@@ -97,31 +103,26 @@ class Agent():
         elif argue_for_or_against == "argue_against":
             move_set = cl_inferential_theory.against_move
 
-        move = random.sample(move_set, 1)[0]
+        move = random.choice(sorted_moves(move_set))
         return move
 
     def _first_move_manual_move(self, frame: MSF, proposal: tuple, cl_inferential_theory: InferentialTheory, argue_for_or_against: str ="argue_for"):
         if argue_for_or_against == "argue_for":
             statement = proposal
             valid_first_move_set = frame.imp
-            frame_move_set = frame.for_move
             move_val = "reason for"
             agent_move_set = cl_inferential_theory.for_move
 
         elif argue_for_or_against == "argue_against":
             statement = proposal[0]
             valid_first_move_set = frame.exc[proposal[1]]
-            frame_move_set = frame.against_move
             move_val = "reason against"
             agent_move_set = cl_inferential_theory.against_move
 
         if statement not in valid_first_move_set:
             print('Not an eligible first reason-for move in this semantic frame')
         else:
-            for m in frame_move_set:
-                if (m.prem == proposal[0]) and (m.conc == proposal[1]) and (m.val == move_val):
-                    prime = m
-                    break
+            prime = frame.get_move(proposal[0], move_val, proposal[1])
             if prime not in agent_move_set:
                 print('The proposal is not in the current agent\'s inferential theory.')
             else:
@@ -140,75 +141,70 @@ class Agent():
                                     argue_for_or_against=argue_for_or_against)
 
     def _get_action(self, prev_stage: Stage) -> MoveType:
+        # Whatever the policy, an agent with no available move passes, returning None. After the first stage, the
+        # inquiry is over before that happens, but CR may have no way to respond to the proposal, see run_episode.
+        if not prev_stage.available_moves['for'] and not prev_stage.available_moves['against']:
+            return None
         if self.policy_name == 'random':
             move = self._random_next_stage(stage=prev_stage)
         elif self.policy_name == 'minimize_ac':
             move = self._minimize_ac_next_stage(stage=prev_stage)
         elif self.policy_name == 'one_step_ahead':
             move = self._one_step_ahead_next_stage(stage=prev_stage)
+        elif self.policy_name == 'minimax':
+            move = self._minimax_next_stage(stage=prev_stage)
+        elif self.policy_name == 'mcts':
+            move = self._mcts_next_stage(stage=prev_stage)
         else:
-            print('Error: Currently, CL and CR have only three strategies: \'random\', \'minimize_ac\' and \'one_step_ahead\'.')
+            print('Error: Currently, CL and CR have only five strategies: \'random\', \'minimize_ac\', \'one_step_ahead\', \'minimax\' and \'mcts\'.')
 
         return move
 
     def _random_next_stage(self, stage):
-        moves = frozenset.union(stage.available_moves['for'], stage.available_moves['against'])
-        prime = random.sample(moves, 1)[0]
+        moves = sorted_moves(frozenset.union(stage.available_moves['for'], stage.available_moves['against']))
+        prime = random.choice(moves)
         return prime
 
     def _minimize_ac_next_stage(self, stage):
-        moves = frozenset.union(stage.available_moves['for'], stage.available_moves['against'])
-        lst_new_ac_length = set()
-        pool = []
-        for i in moves:
-            lst_new_ac_length.add(len(self._get_new_commitment(i, stage)[0]))
-        min_new_ac_length = min(lst_new_ac_length)
-        for i in moves:
-            if len(self._get_new_commitment(i,stage)[0]) == min_new_ac_length:
-                pool.append(i)
+        # One of the moves that add the fewest new acceptance commitments for the mover, see agents.scoring.
+        moves = sorted_moves(frozenset.union(stage.available_moves['for'], stage.available_moves['against']))
+        n_new_ac = new_commitments(stage, moves)['n_ac']
+        min_new_ac_length = n_new_ac.min()
+        pool = [m for m, k in zip(moves, n_new_ac) if k == min_new_ac_length]
 
-        prime = random.sample(frozenset(pool), 1)[0]
+        prime = random.choice(pool)
         return prime
 
-    def _get_new_commitment(self, move, prev_stage):
-        # Computing what the move is grossly adding.
-        if move.val == 'reason for':
-            gross_new_ac = frozenset.union(move.prem, frozenset([move.conc]))
-            gross_new_rc = frozenset()
-        if move.val == 'reason against':
-            gross_new_ac = move.prem
-            gross_new_rc = frozenset([move.conc])
-
-        # Computing the move's net new commitments.
-        if prev_stage.agent == 'CL':
-            new_ac = gross_new_ac - prev_stage.f_score_sit.cr.ac
-            new_rc = gross_new_rc - prev_stage.f_score_sit.cr.rc
-
-        if prev_stage.agent == 'CR':
-            new_ac = gross_new_ac - prev_stage.f_score_sit.cl.ac
-            new_rc = gross_new_rc - prev_stage.f_score_sit.cl.rc
-
-        return (new_ac, new_rc)
-
     def _one_step_ahead_next_stage(self, stage):
-        moves = frozenset.union(stage.available_moves['for'], stage.available_moves['against'])
+        moves = sorted_moves(frozenset.union(stage.available_moves['for'], stage.available_moves['against']))
         pool = []
 
+        # Only the verdict after each move matters here, so we don't make the next stages, see verdict_after.
         for i in moves:
             #Case for CL
             if stage.agent == 'CL':
-                if get_verdict(initial_next_stage_2(stage = stage, prime = i)) == 'fail':
+                if verdict_after(stage, i) == 'fail':
                     pool.append(i)
             #Case for CR
             else:
-                if get_verdict(initial_next_stage_2(stage = stage, prime = i)) == 'sustain':
+                if verdict_after(stage, i) == 'sustain':
                     pool.append(i)
 
         if len(pool) != 0:
-            prime = random.sample(frozenset(pool), 1)[0]
+            prime = random.choice(pool)
         else:
-            prime = random.sample(frozenset(moves), 1)[0]
+            prime = random.choice(moves)
         return prime
 
+    def _minimax_next_stage(self, stage):
+        # One of the best moves found by a depth-limited alpha-beta search, see agents.minimax.minimax_moves.
+        value, moves = minimax_moves(stage, table=self.search_table, **self.policy_kwargs)
+        prime = random.choice(moves)
+        return prime
 
-
+    def _mcts_next_stage(self, stage):
+        # The best move found by Monte Carlo tree search, see agents.mcts.mcts_search. The search tree is kept, so that
+        # the next search goes on from the node of the next stage.
+        self.search_tree = mcts_search(stage, tree=self.search_tree, **self.policy_kwargs)
+        prime = self.search_tree.best_move()
+        return prime
@@ -0,0 +1,176 @@
+""" defines the bitmask representation of a material semantic frame (MSF)
+"""
+
+from utils.bitmask_utils import set_to_mask, bitset_members, masks_containing, bitset_to_array, array_to_bitset
+from utils.language_tables import language_tables
+from utils.language_utils import exff_mask_array, random_inc_array, random_imp_co_exff_array
+
+
+class BitMSF:
+    """
+    A class used to represent a material semantic frame with integers instead of frozensets.
+    Every subset of the enumerated language is a mask (see utils.bitmask_utils), so that subset tests, unions and
+    membership checks are single integer operations.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+    imp : list
+        a list of n bitsets over premise masks, one for each conclusion. The bit at position m of imp[c] is set iff the
+        premises with mask m imply the sentence indexed by c.
+    inc : int
+        a bitset over all 2^n masks. The bit at position m is set iff the set of sentences with mask m is incoherent.
+
+    Attributes
+    ----------
+    n : int
+        The length of the enumerated language.
+    imp : list
+        a list of n bitsets over premise masks, one for each conclusion.
+    inc : int
+        a bitset over all 2^n masks of incoherent sets.
+    exff : int
+        a bitset over all 2^n masks of persistently incoherent sets, i.e. incoherent sets all of whose supersets are
+        incoherent as well.
+    """
+    def __init__(self, n, imp, inc):
+        self.n = n
+        self.imp = imp
+        self.inc = inc
+        self.exff = self._exff_generator(n, inc)
+
+    def implies(self, prem: int, conc: int) -> bool:
+        return bool(self.imp[conc] >> prem & 1)
+
+    def is_inc(self, mask: int) -> bool:
+        return bool(self.inc >> mask & 1)
+
+    def is_exff(self, mask: int) -> bool:
+        return bool(self.exff >> mask & 1)
+
+    def imp_masks(self, conc: int) -> list:
+        # The premise masks of all implications with the given conclusion.
+        return bitset_members(self.imp[conc])
+
+    def inc_masks(self) -> list:
+        return bitset_members(self.inc)
+
+    def exff_masks(self) -> list:
+        return bitset_members(self.exff)
+
+    def exc_masks(self, conc: int) -> list:
+        # The masks of all sets that exclude the given sentence, leaving out persistently incoherent sets and the empty
+        # set in the same way as MSF._exc_generator.
+        bit = 1 << conc
+        result = []
+        for m in bitset_members(self.inc & masks_containing(conc, self.n)):
+            rest = m & ~bit
+            if rest and not self.exff >> rest & 1:
+                result.append(rest)
+        return result
+
+    def to_sets(self):
+        """
+        Returns
+        -------
+        tuple
+            (imp, inc) in the frozenset representation used by MSF.
+        """
+        subsets = language_tables(self.n).subsets
+        imp = frozenset((subsets[p], c) for c in range(self.n) for p in self.imp_masks(c))
+        inc = frozenset(subsets[m] for m in self.inc_masks())
+        return imp, inc
+
+    def to_bytes(self) -> bytes:
+        """
+        Encode this BitMSF canonically, in time linear in its size. The encoding is one byte for n, then the n bitsets
+        of imp, in order of conclusion, then the bitset of inc. Each bitset is written little-endian in (2^n + 7) // 8
+        bytes, so the bit for mask m is bit m % 8 of byte m // 8. It doesn't depend on any iteration order.
+
+        Returns
+        -------
+        bytes
+            The encoding, which bit_msf_from_bytes turns back into an equal BitMSF.
+        """
+        size = (2 ** self.n + 7) // 8
+        return bytes([self.n]) + b''.join(i.to_bytes(size, 'little') for i in self.imp) + self.inc.to_bytes(size, 'little')
+
+    def _exff_generator(self, n, inc):
+        # A set is persistently incoherent iff it and all its supersets are incoherent, see exff_mask_array.
+        return array_to_bitset(exff_mask_array(n, bitset_to_array(inc, 1 << n)))
+
+
+def bit_msf_from_sets(language: list, imp: frozenset, inc: frozenset) -> BitMSF:
+    """
+    Build the bitmask representation of an MSF from the frozenset representation.
+
+    Parameters
+    ----------
+    language : list
+        A list of strings, each string is a sentence.
+        e.g. ['a_0', 'a_1', 'a_2'] or ['red', 'Bob is nice', 'Yao is cool']
+    imp : frozenset
+        a set of implications, each implication is a tuple, whose first element is a frozenset of integers, for indexes
+        of premises and second element an integer, for the index of the conclusions.
+    inc : frozenset
+        a set of incoherent sets. Each member of inc is a frozenset of integers.
+
+    Returns
+    -------
+    BitMSF
+    """
+    n = len(language)
+    bit_imp = [0] * n
+    for i in imp:
+        bit_imp[i[1]] |= 1 << set_to_mask(i[0])
+    bit_inc = 0
+    for i in inc:
+        bit_inc |= 1 << set_to_mask(i)
+    return BitMSF(n, bit_imp, bit_inc)
+
+
+def bit_msf_from_bytes(data: bytes) -> BitMSF:
+    """
+    Decode the encoding of BitMSF.to_bytes, without going through the frozenset representation.
+
+    Parameters
+    ----------
+    data : bytes
+        The encoding of a BitMSF.
+
+    Returns
+    -------
+    BitMSF
+    """
+    n = data[0]
+    size = (2 ** n + 7) // 8
+    if len(data) != 1 + (n + 1) * size:
+        raise ValueError(f"Error: An encoded MSF over {n} sentences must have {1 + (n + 1) * size} bytes, not {len(data)}.")
+    imp = [int.from_bytes(data[1 + c * size: 1 + (c + 1) * size], 'little') for c in range(n)]
+    inc = int.from_bytes(data[1 + n * size:], 'little')
+    return BitMSF(n, imp, inc)
+
+
+def random_bit_msfs(n: int, n_msfs: int = 1, imp_size = 'random', imp_chance = 0.5, inc_size = 'random', inc_chance = 0.5) -> list:
+    """
+    Generate a batch of random BitMSFs at once, sampling with NumPy directly into bit arrays, with the same
+    distribution and parameters as agents.msf.random_msf.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+    n_msfs : int
+        The number of BitMSFs to generate.
+    imp_size, imp_chance, inc_size, inc_chance
+        As in agents.msf.random_msf.
+
+    Returns
+    -------
+    list
+        a list of n_msfs BitMSFs.
+    """
+    inc = random_inc_array(n, n_samples = n_msfs, size = inc_size, chance = inc_chance)
+    imp = random_imp_co_exff_array(n, inc, size = imp_size, chance = imp_chance)
+    return [BitMSF(n, [array_to_bitset(row) for row in imp[k]], array_to_bitset(inc[k])) for k in range(n_msfs)]
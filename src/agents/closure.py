@@ -0,0 +1,207 @@
+""" defines the closure of MSFs under CM, CT and exff, computed semi-naively
+"""
+
+from collections import deque
+
+import numpy as np
+
+from agents.bit_msf import BitMSF
+from agents.msf import msf_from_bits
+from utils.bitmask_utils import set_to_mask, mask_members, bitset_members, full_mask
+from utils.language_tables import language_tables
+from utils.language_utils import superset_sums
+
+
+# The rules close can close under. 'cm' and 'ct' stand for both their implication and incoherence parts.
+CLOSURE_RULES = ('cm_imp', 'cm_inc', 'ct_imp', 'ct_inc', 'exff')
+RULE_GROUPS = {'cm': ('cm_imp', 'cm_inc'), 'ct': ('ct_imp', 'ct_inc')}
+
+
+def close(msf, rules=('cm', 'ct', 'exff')):
+    """
+    Close an MSF under the given rules, until a fixed point is reached. With Γ a set of sentences and A, B sentences:
+    cm_imp: if Γ implies A and Γ implies B, then Γ, A implies B.
+    cm_inc: if Γ implies A and Γ is incoherent, then Γ, A is incoherent.
+    ct_imp: if Γ implies A and Γ, A implies B, then Γ implies B.
+    ct_inc: if Γ implies A and Γ, A is incoherent, then Γ is incoherent.
+    exff: if Γ is persistently incoherent, then Γ implies every sentence.
+
+    Parameters
+    ----------
+    msf : MSF
+        The MSF to be closed.
+    rules : list
+        The names of the rules to close under, among 'cm_imp', 'cm_inc', 'ct_imp', 'ct_inc' and 'exff', where 'cm' and
+        'ct' stand for both of their parts.
+
+    Returns
+    -------
+    MSF
+        The smallest MSF over the same language that contains msf and is closed under the rules.
+    """
+    rules = _expand_rules(rules)
+    bits = msf.bits
+    imp = dict()
+    for c in range(bits.n):
+        for p in bitset_members(bits.imp[c]):
+            imp[p] = imp.get(p, 0) | 1 << c
+    imp, inc = close_masks(bits.n, imp, set(bitset_members(bits.inc)), rules)
+
+    bit_imp = [0] * bits.n
+    for p, concs in imp.items():
+        for c in mask_members(concs):
+            bit_imp[c] |= 1 << p
+    bit_inc = 0
+    for m in inc:
+        bit_inc |= 1 << m
+    return msf_from_bits(msf.lang, BitMSF(bits.n, bit_imp, bit_inc))
+
+
+def close_sets(n, imp, inc, rules):
+    """
+    The frozenset version of close, for a language of n sentences.
+
+    Parameters
+    ----------
+    n : int or None
+        The length of the enumerated language. If None, it's taken to be one more than the largest index in imp and inc.
+    imp : frozenset
+        a set of implications, each a tuple of a frozenset of indexes of premises and the index of the conclusion.
+    inc : frozenset
+        a set of incoherent sets, each a frozenset of indexes of sentences.
+    rules : list
+        As in close.
+
+    Returns
+    -------
+    tuple
+        (imp, inc) closed under the rules, as frozensets.
+    """
+    if n is None:
+        n = 1 + max([i[1] for i in imp] + [j for i in imp for j in i[0]] + [j for i in inc for j in i], default=-1)
+    imp_masks = dict()
+    for i in imp:
+        p = set_to_mask(i[0])
+        imp_masks[p] = imp_masks.get(p, 0) | 1 << i[1]
+    imp_masks, inc_masks = close_masks(n, imp_masks, set(set_to_mask(i) for i in inc), _expand_rules(rules))
+    subsets = language_tables(n).subsets
+    return (frozenset((subsets[p], c) for p, concs in imp_masks.items() for c in mask_members(concs)),
+            frozenset(subsets[m] for m in inc_masks))
+
+
+def close_masks(n, imp, inc, rules):
+    """
+    The engine behind close. It's semi-naive: instead of applying every rule to everything until nothing changes, it
+    keeps a queue of what has changed, i.e. conclusions newly implied by some premises and newly incoherent sets, and
+    only joins those with what's already there. Implications are kept in a dict from premises to conclusions, so
+    that the other premises a rule needs are looked up by hashing rather than searched for.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+    imp : dict
+        maps the mask of a set of premises to the mask of the sentences it implies. It's closed in place.
+    inc : set
+        the masks of the incoherent sets. It's closed in place.
+    rules : frozenset
+        The names of the rules to close under, among CLOSURE_RULES.
+
+    Returns
+    -------
+    tuple
+        (imp, inc), closed under the rules.
+    """
+    queue = deque()
+    full = full_mask(n)
+
+    # For exff, we count the incoherent supersets of every set, see utils.language_utils.exff_mask_array. A set is
+    # persistently incoherent once the count reaches the number of its supersets.
+    if 'exff' in rules:
+        indicator = np.zeros(1 << n, dtype=bool)
+        indicator[list(inc)] = True
+        counts = superset_sums(indicator, n)
+        n_supersets = np.left_shift(1, n - language_tables(n).mask_sizes)
+        exff = np.flatnonzero(counts == n_supersets).tolist()
+        counts, n_supersets = counts.tolist(), n_supersets.tolist()
+
+    def add_imp(prem, concs):
+        new = concs & ~imp.get(prem, 0)
+        if new:
+            imp[prem] = imp.get(prem, 0) | new
+            queue.append((prem, new))
+
+    def add_inc(gamma):
+        if gamma not in inc:
+            inc.add(gamma)
+            queue.append((gamma, None))
+            if 'exff' in rules:
+                # Every subset of gamma gains an incoherent superset.
+                sub = gamma
+                while True:
+                    counts[sub] += 1
+                    if counts[sub] == n_supersets[sub]:
+                        add_imp(sub, full)
+                    if sub == 0:
+                        break
+                    sub = (sub - 1) & gamma
+
+    # The initial sets and implications count as new.
+    for gamma in inc:
+        queue.append((gamma, None))
+    for prem, concs in imp.items():
+        queue.append((prem, concs))
+    if 'exff' in rules:
+        for m in exff:
+            add_imp(m, full)
+
+    while queue:
+        gamma, new = queue.popleft()
+        concs = imp.get(gamma, 0)
+        if new is None:
+            # gamma has become incoherent.
+            if 'cm_inc' in rules:
+                for a in mask_members(concs & ~gamma):
+                    add_inc(gamma | 1 << a)
+            if 'ct_inc' in rules:
+                for a in mask_members(gamma):
+                    delta = gamma & ~(1 << a)
+                    if imp.get(delta, 0) >> a & 1:
+                        add_inc(delta)
+        else:
+            # gamma has come to imply the sentences in new.
+            if 'cm_imp' in rules:
+                # gamma, a implies everything gamma implies, for every a gamma implies. For the a gamma implied
+                # before, only the new conclusions are new to gamma, a.
+                for a in mask_members(concs & ~gamma):
+                    add_imp(gamma | 1 << a, concs if new >> a & 1 else new)
+            if 'ct_imp' in rules:
+                # gamma implies everything gamma, a implies, for every new a gamma implies. And for every a in gamma
+                # that gamma - a implies, gamma - a implies the new conclusions of gamma.
+                for a in mask_members(new & ~gamma):
+                    add_imp(gamma, imp.get(gamma | 1 << a, 0))
+                for a in mask_members(gamma):
+                    delta = gamma & ~(1 << a)
+                    if imp.get(delta, 0) >> a & 1:
+                        add_imp(delta, new)
+            if 'cm_inc' in rules and gamma in inc:
+                for a in mask_members(new & ~gamma):
+                    add_inc(gamma | 1 << a)
+            if 'ct_inc' in rules:
+                for a in mask_members(new & ~gamma):
+                    if (gamma | 1 << a) in inc:
+                        add_inc(gamma)
+
+    return imp, inc
+
+
+def _expand_rules(rules):
+    result = []
+    for rule in rules:
+        if rule in RULE_GROUPS:
+            result.extend(RULE_GROUPS[rule])
+        elif rule in CLOSURE_RULES:
+            result.append(rule)
+        else:
+            raise ValueError(f"Error: Closure rules must be among {CLOSURE_RULES + tuple(RULE_GROUPS)}.")
+    return frozenset(result)
@@ -2,27 +2,69 @@
 """
 
 import random
+from functools import cached_property
+
 import numpy as np
+from agents.move import sorted_moves, moves_by_conc, moves_by_prem, moves_by_sentence
 from utils.utils import wrap_list
 
 
+# The size in bytes of the write buffer of InferentialTheory.export.
+EXPORT_BUFFER_SIZE = 1 << 20
+
+
 class InferentialTheory:
     def __init__(self, for_move, against_move):
         # frozensets of all for- and against-moves to be used by an agent with this InferentialTheory. All members of this frozenset are objects of class MoveType.
         self.for_move = for_move
         self.against_move = against_move
-        self.arg = self._arg_generator(for_move = self.for_move, against_move = self.against_move)
-        self.att = self._att_generator(for_move = self.for_move, against_move = self.against_move)
+
+    # Everything below is derived from for_move and against_move, and only computed the first time it's used. Theories
+    # are built for every agent and every inferential common ground, but most of them are never exported.
+
+    # Indexes of the moves of this theory, mapping a sentence to a tuple of moves: reasons-for and reasons-against
+    # and all moves by their conclusion, reasons-for and reasons-against by each of their premises, and all moves by
+    # each sentence they touch, i.e. their conclusion and premises. See agents.move.moves_by_conc and friends.
+    @cached_property
+    def for_move_by_conc(self) -> dict:
+        return moves_by_conc(self.for_move)
+
+    @cached_property
+    def against_move_by_conc(self) -> dict:
+        return moves_by_conc(self.against_move)
+
+    @cached_property
+    def move_by_conc(self) -> dict:
+        return moves_by_conc(frozenset.union(self.for_move, self.against_move))
+
+    @cached_property
+    def for_move_by_prem(self) -> dict:
+        return moves_by_prem(self.for_move)
+
+    @cached_property
+    def against_move_by_prem(self) -> dict:
+        return moves_by_prem(self.against_move)
+
+    @cached_property
+    def move_by_sentence(self) -> dict:
+        return moves_by_sentence(frozenset.union(self.for_move, self.against_move))
+
+    # The arguments and attacks of the argumentation frame of this theory, see export.
+    @cached_property
+    def arg(self) -> list:
+        return self._arg_generator(for_move = self.for_move, against_move = self.against_move)
+
+    @cached_property
+    def att(self) -> list:
+        return self._att_generator(for_move = self.for_move, against_move = self.against_move)
 
     def export(self, filename):   #method for exporting an Inferential Theory as an argumentation frame in Aspartix format as a .txt file. You will have to manually change the extension of the txt file to .dl, for now.
-        f = open(filename, 'w')
-        f.write("% arguments\n")
-        for arg in self.arg:
-            f.write('arg(' + arg + ').\n')
-        f.write("\n% attack relations\n")
-        for att in self.att:
-            f.write('att(' + att[0] + ',' + att[1] + ').\n')
-        f.close()
+        # Lines are streamed through a large write buffer rather than written one call at a time.
+        with open(filename, 'w', buffering=EXPORT_BUFFER_SIZE) as f:
+            f.write("% arguments\n")
+            f.writelines('arg(' + arg + ').\n' for arg in self.arg)
+            f.write("\n% attack relations\n")
+            f.writelines('att(' + att[0] + ',' + att[1] + ').\n' for att in self.att)
 
     def show(self):
         print('^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^Beginning of an InferentialTheory display^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^')
@@ -60,20 +102,25 @@ class InferentialTheory:
         attfromformove = []
         attfromagainstmove = []
 
+        # A reason-for attacks the reasons-against with the same conclusion. A reason-against attacks the reasons-for
+        # using its conclusion as a premise or having the same conclusion, and the reasons-against using its conclusion
+        # as a premise. Instead of testing all pairs, we look the attacked moves up in the indexes of this theory, so
+        # this takes time linear in the number of moves plus the number of attacks.
+        for_move_by_conc, against_move_by_conc = self.for_move_by_conc, self.against_move_by_conc
+        for_move_by_prem, against_move_by_prem = self.for_move_by_prem, self.against_move_by_prem
+
         for formove in for_move:
-            for againstmove in against_move:
-                if formove.conc == againstmove.conc:
-                    attfromformove.append((formove.short_label, againstmove.short_label))
+            for againstmove in against_move_by_conc.get(formove.conc, ()):
+                attfromformove.append((formove.short_label, againstmove.short_label))
 
         for againstmove in against_move:
-            for formove in for_move:
-                if againstmove.conc in formove.prem:
-                    attfromagainstmove.append((againstmove.short_label, formove.short_label))
-                elif againstmove.conc == formove.conc:
+            for formove in for_move_by_prem.get(againstmove.conc, ()):
+                attfromagainstmove.append((againstmove.short_label, formove.short_label))
+            for formove in for_move_by_conc.get(againstmove.conc, ()):
+                if againstmove.conc not in formove.prem:
                     attfromagainstmove.append((againstmove.short_label, formove.short_label))
-            for otheragainstmove in against_move:
-                if againstmove.conc in otheragainstmove.prem:
-                    attfromagainstmove.append((againstmove.short_label, otheragainstmove.short_label))
+            for otheragainstmove in against_move_by_prem.get(againstmove.conc, ()):
+                attfromagainstmove.append((againstmove.short_label, otheragainstmove.short_label))
 
         allatt = attfromformove + attfromagainstmove
         allatt.sort()
@@ -86,19 +133,19 @@ def random_inferential_theory_generator(msf, for_move_size = 'random', against_m
     if for_move_size != 'random':
         if for_move_size > len(msf.for_move):
             print('Warning: the declared for_move_size is larger than the size of all for-moves in the universe of reasons.')
-        selected_for_move = frozenset(random.sample(msf.for_move, for_move_size))
+        selected_for_move = frozenset(random.sample(sorted_moves(msf.for_move), for_move_size))
     else:
         k = np.random.binomial(len(msf.for_move), for_move_chance)
-        selected_for_move = frozenset(random.sample(msf.for_move, k))
+        selected_for_move = frozenset(random.sample(sorted_moves(msf.for_move), k))
 
     # Part for against_move
     if against_move_size != 'random':
         if against_move_size > len(msf.against_move):
             print('Warning: the declared against_move_size is larger than the size of all against-moves in the universe of reasons.')
-        selected_against_move = frozenset(random.sample(msf.against_move, against_move_size))
+        selected_against_move = frozenset(random.sample(sorted_moves(msf.against_move), against_move_size))
     else:
         k = np.random.binomial(len(msf.against_move), against_move_chance)
-        selected_against_move = frozenset(random.sample(msf.against_move, k))
+        selected_against_move = frozenset(random.sample(sorted_moves(msf.against_move), k))
 
     return InferentialTheory(for_move = selected_for_move, against_move = selected_against_move)
 
@@ -0,0 +1,126 @@
+""" defines a Monte Carlo tree search (UCT) over the game tree of an inquiry
+"""
+
+import math
+import random
+
+from env.game_tree import position_from_stage, random_playout
+
+
+# The defaults of mcts_search: how many playouts it runs per move, and how much it explores, see MCTSNode.uct.
+MCTS_N_SIMULATIONS = 200
+MCTS_EXPLORATION = math.sqrt(2)
+
+
+class MCTSNode:
+    """
+    A class used to represent a node of the search tree of mcts_search, i.e. a position and what the playouts through
+    it found.
+
+    Parameters
+    ----------
+    position : Position
+        The position of the node, see env.game_tree.
+    parent : MCTSNode
+        The node of the previous position, None at the root.
+
+    Attributes
+    ----------
+    children : dict
+        maps the moves tried so far at this position to the nodes they lead to.
+    untried : list
+        The available moves that have no node yet.
+    n_visits : int
+        The number of playouts through this node.
+    n_wins : int
+        The number of those playouts won by the agent who moved into this node, i.e. position.agent: CL wins if the
+        proposal is sustained and CR if it fails.
+    """
+    __slots__ = ('position', 'parent', 'children', 'untried', 'n_visits', 'n_wins')
+
+    def __init__(self, position, parent=None):
+        self.position = position
+        self.parent = parent
+        self.children = dict()
+        self.untried = list(reversed(position.available_moves()))
+        self.n_visits = 0
+        self.n_wins = 0
+
+    def uct(self, exploration: float) -> float:
+        # The upper confidence bound of the node's win rate, which its parent maximizes when choosing where to go.
+        return self.n_wins / self.n_visits + exploration * math.sqrt(math.log(self.parent.n_visits) / self.n_visits)
+
+    def best_move(self):
+        # The move of the most visited child, i.e. the move the search trusts most.
+        return max(self.children, key=lambda m: self.children[m].n_visits)
+
+
+def mcts_search(stage, n_simulations: int = MCTS_N_SIMULATIONS, exploration: float = MCTS_EXPLORATION, tree=None,
+                rng=random) -> MCTSNode:
+    """
+    Search the game tree below stage with UCT: each simulation walks down the tree choosing the child with the
+    highest MCTSNode.uct, adds a node for an untried move, plays the inquiry on from there at random with
+    env.game_tree.random_playout and counts the verdict in every node on the way back up.
+
+    If tree is the root of a previous search over the same inquiry, e.g. the one of the agent's previous move, the
+    node of stage is looked for among its descendants and, if found, the search goes on from there, keeping the
+    playouts already made.
+
+    Parameters
+    ----------
+    stage : Stage
+        The stage after which the next mover is to move.
+    n_simulations : int
+        The number of playouts to run.
+    exploration : float
+        The weight of exploration in MCTSNode.uct.
+    tree : MCTSNode
+        The root of a previous search, or None.
+    rng : random.Random
+        The source of randomness, by default the random module.
+
+    Returns
+    -------
+    MCTSNode
+        The root of the search tree. Its best_move is the move to make.
+    """
+    if n_simulations < 1:
+        raise ValueError("Error: MCTS must run at least 1 simulation.")
+    position = position_from_stage(stage)
+    root = _find_node(tree, position) if tree is not None else None
+    if root is None:
+        root = MCTSNode(position)
+    root.parent = None
+
+    for i in range(n_simulations):
+        node = root
+        # Selection
+        while not node.untried and node.children:
+            node = max(node.children.values(), key=lambda c: c.uct(exploration))
+        # Expansion
+        if node.untried:
+            move = node.untried.pop()
+            child = MCTSNode(node.position.move(move), parent=node)
+            node.children[move] = child
+            node = child
+        # Simulation
+        verdict = random_playout(node.position, rng)
+        # Backpropagation
+        while node is not None:
+            node.n_visits += 1
+            if (verdict == 'sustain') == (node.position.agent == 'CL'):
+                node.n_wins += 1
+            node = node.parent
+    return root
+
+
+def _find_node(tree, position, max_depth=2):
+    # The node of position among the descendants of tree, at most max_depth moves down, or None. Between two moves
+    # of an agent there are two, the agent's and the opponent's.
+    nodes = [tree]
+    for depth in range(max_depth + 1):
+        for node in nodes:
+            if node.position.key == position.key:
+                return node
+        nodes = [c for node in nodes for c in node.children.values()]
+    return None
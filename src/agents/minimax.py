@@ -0,0 +1,133 @@
+""" defines a depth-limited minimax search, with alpha-beta pruning, over the game tree of an inquiry
+"""
+
+import time
+
+from utils.env_utils import switch_agents
+from env.stage import VERDICT_VALUES
+from env.game_tree import position_from_stage
+from env.transpositions import TranspositionTable
+
+
+# The defaults of minimax_moves: how many moves it looks ahead at most, and for how many seconds it deepens its search.
+MINIMAX_MAX_DEPTH = 8
+MINIMAX_TIME_BUDGET = 1.0
+
+# Entries of the state cache are (depth, value, flag, best move), where flag tells whether value is the exact value of
+# the position or only a lower or upper bound on it. Positions whose whole game tree was searched get depth COMPLETE.
+EXACT, LOWER, UPPER = 'exact', 'lower', 'upper'
+COMPLETE = float('inf')
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def minimax_moves(stage, max_depth: int = MINIMAX_MAX_DEPTH, time_budget: float = MINIMAX_TIME_BUDGET, table=None):
+    """
+    Search the game tree below stage for the best moves of the next mover, with alpha-beta pruning and iterative
+    deepening: the search looks 1, 2, ... moves ahead until it has looked max_depth moves ahead, has searched the whole
+    tree or has run out of time, and keeps what the last finished search found. Where the search stops looking
+    ahead, the verdict at that point stands in for the final one. The first search, one move ahead, always finishes.
+
+    Positions (see env.game_tree) stand in for stages, and what's found about each is kept in table, so that a position
+    reached by moves in different orders is only searched once, in this search as in later ones.
+
+    Parameters
+    ----------
+    stage : Stage
+        The stage after which the next mover is to move.
+    max_depth : int
+        The most moves to look ahead, counting the next one.
+    time_budget : float
+        The number of seconds after which no deeper search is started and the current one is given up.
+    table : TranspositionTable
+        The state cache, to be kept between searches over the same inquiry. If None, a new one is used.
+
+    Returns
+    -------
+    tuple
+        (value, moves): the value for CL of the best moves of the next mover, 1 if the proposal is sustained and 0
+        if it fails, and the list of those moves.
+    """
+    if max_depth < 1:
+        raise ValueError("Error: Minimax must look at least 1 move ahead.")
+    if table is None:
+        table = TranspositionTable()
+    deadline = time.perf_counter() + time_budget
+    root = position_from_stage(stage)
+    maximize = switch_agents(root.agent) == 'CL'
+    if root.is_over():
+        return VERDICT_VALUES[root.verdict()], []
+
+    best = None
+    for depth in range(1, max_depth + 1):
+        try:
+            values, complete = _search_root(root, depth, table, None if depth == 1 else deadline)
+        except _OutOfTime:
+            break
+        value = max(values.values()) if maximize else min(values.values())
+        best = (value, [m for m in root.available_moves() if values[m] == value])
+        if complete or time.perf_counter() > deadline:
+            break
+    return best
+
+
+def _search_root(root, depth, table, deadline):
+    # At the root, every move is searched with the full window, so that the values of all of them are exact and we get
+    # all the best moves, not just one.
+    values = dict()
+    complete = True
+    for m in root.available_moves():
+        values[m], child_complete = _alpha_beta(root.move(m), depth - 1, 0, 1, table, deadline)
+        complete = complete and child_complete
+    return values, complete
+
+
+def _alpha_beta(position, depth, alpha, beta, table, deadline):
+    # Returns the value of position, looking depth moves ahead, and whether the search got to the end of every
+    # line. Fail-hard: a value <= alpha is only an upper bound, a value >= beta only a lower bound.
+    if deadline is not None and time.perf_counter() > deadline:
+        raise _OutOfTime()
+
+    moves = position.available_moves()
+    if not moves:
+        return VERDICT_VALUES[position.verdict()], True
+    if depth == 0:
+        return VERDICT_VALUES[position.verdict()], False
+
+    entry = table.get(position.key)
+    best_move = None
+    if entry is not None:
+        entry_depth, value, flag, best_move = entry
+        if entry_depth >= depth:
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                return value, entry_depth == COMPLETE
+        # Otherwise, the best move of the shallower search is tried first.
+        if best_move is not None:
+            moves = (best_move,) + tuple(m for m in moves if m != best_move)
+
+    maximize = switch_agents(position.agent) == 'CL'
+    alpha_orig, beta_orig = alpha, beta
+    value = None
+    complete = True
+    for m in moves:
+        child_value, child_complete = _alpha_beta(position.move(m), depth - 1, alpha, beta, table, deadline)
+        complete = complete and child_complete
+        if value is None or (child_value > value if maximize else child_value < value):
+            value, best_move = child_value, m
+        if maximize:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            break
+
+    if value <= alpha_orig:
+        flag = UPPER
+    elif value >= beta_orig:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.put(position.key, (COMPLETE if complete else depth, value, flag, best_move))
+    return value, complete
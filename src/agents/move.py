@@ -1,12 +1,32 @@
 """ basic moves that can be made by agents in the dialogue
 """
 
+import weakref
+
+from utils.bitmask_utils import set_to_mask
+
 
 class MoveType:
     """
     A class used to represent a move-type.
     It only records the premises, the conclusions, both as numbers, the valence (reason for or reason against)
     and the label of a move. Labels are of form: a_1, a_2, a_3 entails/excludes a_4.
+    MoveTypes are immutable values: two of them are equal iff they have the same premises, valence and conclusion.
+    They are also interned, i.e. MoveType(prem, val, conc, lang) returns the existing object for the same premises,
+    valence, conclusion and language whenever there is one, so that all MSFs over a language share their moves.
+    Labels are only made the first time they are used.
+
+    Parameters
+    ----------
+    prem : frozenset
+        see Attributes.
+    val : str
+        see Attributes.
+    conc : int
+        see Attributes.
+    lang : list, optional
+        the enumerated language the indexes refer to, only used for move_label. Without it, sentences are labelled
+        a_0, a_1, ... by their indexes.
 
     Attributes
     ----------
@@ -18,15 +38,72 @@ class MoveType:
         it's either 'reason for' or 'reason against'
     conc : int
         the index of a sentence in the enumerated language, as an integer
+    prem_mask : int
+        the premises as a bitmask, see utils.bitmask_utils
+    key : tuple
+        (prem_mask, val, conc), which identifies the move-type
+    lang : tuple or None
+        the enumerated language the move-type was made with
     move_label : str
-        a str for the name of this move-type, e.g. 'a_1, a_2, a_3 entails a_4', or 'a_2, a_5 excludes a_1'
+        a str for the name of this move-type, e.g. "['a_1', 'a_2', 'a_3'] entails a_4", or "['a_2', 'a_5'] excludes a_1"
+    short_label : str
+        a short str for the name of this move-type, e.g. '123F4' or '25A1'
     """
-    def __init__(self, prem, val, conc, move_label):
-        self.prem = prem
-        self.val = val
-        self.conc = conc
-        self.move_label = self._make_label(move_label, self.prem, self.val, self.conc)
-        self.short_label = self._make_short_label(prem = self.prem, val = self.val, conc = self.conc)
+    __slots__ = ('prem', 'prem_mask', 'val', 'conc', 'key', 'lang', '_move_label', '_short_label', '__weakref__')
+
+    # Interned move-types, by key and language. Entries go away with the last reference to their move-type.
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, prem, val, conc, lang=None):
+        prem_mask = set_to_mask(prem)
+        if lang is not None:
+            lang = tuple(lang)
+        move = cls._interned.get((prem_mask, val, conc, lang))
+        if move is None:
+            move = object.__new__(cls)
+            for name, value in [('prem', frozenset(prem)), ('prem_mask', prem_mask), ('val', val), ('conc', conc),
+                                ('key', (prem_mask, val, conc)), ('lang', lang), ('_move_label', None),
+                                ('_short_label', None)]:
+                object.__setattr__(move, name, value)
+            cls._interned[(prem_mask, val, conc, lang)] = move
+        return move
+
+    def __setattr__(self, name, value):
+        raise AttributeError('MoveType is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('MoveType is immutable.')
+
+    def __reduce__(self):
+        # Unpickling goes through __new__, so that it gives back the interned move-type.
+        return (MoveType, (self.prem, self.val, self.conc, self.lang))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, MoveType):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        # Hash by content rather than by identity, so that the iteration order of sets of moves, and with it every seeded
+        # random draw from them, is the same in every process.
+        return hash((self.prem_mask, self.val == 'reason for', self.conc))
+
+    def __repr__(self):
+        return 'MoveType(' + self.to_text() + ')'
+
+    @property
+    def move_label(self) -> str:
+        if self._move_label is None:
+            object.__setattr__(self, '_move_label', self._make_label(self.prem, self.val, self.conc, self.lang))
+        return self._move_label
+
+    @property
+    def short_label(self) -> str:
+        if self._short_label is None:
+            object.__setattr__(self, '_short_label', self._make_short_label(prem = self.prem, val = self.val, conc = self.conc))
+        return self._short_label
 
     def show(self):
         print(self.move_label)
@@ -38,21 +115,13 @@ class MoveType:
             text = str(set(self.prem)) + '#' + str(self.conc)
         return text
 
-    def _make_label(self, label, prem, val, conc):
-        if label:
-            pass
+    def _make_label(self, prem, val, conc, lang):
+        if lang is None:
+            lang = ['a_' + str(i) for i in range(max(prem | {conc}) + 1)]
+        if val == 'reason for':
+            return str(sorted({lang[i] for i in prem})) + ' entails ' + lang[conc]
         else:
-            label = 'a_'
-            for p in prem:
-                label += str(p) + ', a_'
-            label = label[0:-4] # strip trailing ', a_'
-            if val == 'reason for':
-                label += ' entails '
-            else:
-                label += ' excludes '
-            label += 'a_' + str(conc)
-
-        return label
+            return str(sorted({lang[i] for i in prem})) + ' excludes ' + lang[conc]
 
     def _make_short_label(self, prem, val, conc):
         shortlable = str()
@@ -66,6 +135,40 @@ class MoveType:
         return shortlable
 
 
+def sorted_moves(moves) -> tuple:
+    """ This gives the moves as a tuple sorted by key, an order that random draws can be made from reproducibly """
+    return tuple(sorted(moves, key=lambda m: m.key))
+
+
+def moves_by_conc(moves) -> dict:
+    """ This maps each sentence to the tuple of moves concluding it, in the iteration order of moves """
+    result = dict()
+    for move in moves:
+        result.setdefault(move.conc, []).append(move)
+    return {i: tuple(lst) for i, lst in result.items()}
+
+
+def moves_by_prem(moves) -> dict:
+    """ This maps each sentence to the tuple of moves having it among their premises, in the iteration order of moves """
+    result = dict()
+    for move in moves:
+        for i in move.prem:
+            result.setdefault(i, []).append(move)
+    return {i: tuple(lst) for i, lst in result.items()}
+
+
+def moves_by_sentence(moves) -> dict:
+    """ This maps each sentence to the tuple of moves it's the conclusion or a premise of, in the iteration order of
+    moves """
+    result = dict()
+    for move in moves:
+        result.setdefault(move.conc, []).append(move)
+        for i in move.prem:
+            if i != move.conc:
+                result.setdefault(i, []).append(move)
+    return {i: tuple(lst) for i, lst in result.items()}
+
+
 def same_move_type(movetype_1, movetype_2):
     if movetype_1.prem == movetype_2.prem and movetype_1.val == movetype_2.val and movetype_1.conc == movetype_2.conc:
         val = True
@@ -76,9 +179,7 @@ def same_move_type(movetype_1, movetype_2):
 
 def flip_val(sequent: MoveType) -> MoveType:
     if sequent.val == 'reason for':
-        move = MoveType(sequent.prem, 'reason against', sequent.conc,
-                                    sequent.move_label.replace('entails', 'excludes'))
+        move = MoveType(sequent.prem, 'reason against', sequent.conc, sequent.lang)
     else:
-        move = MoveType(sequent.prem, 'reason for', sequent.conc,
-                                    sequent.move_label.replace('excludes', 'entails'))
+        move = MoveType(sequent.prem, 'reason for', sequent.conc, sequent.lang)
     return move
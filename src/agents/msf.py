@@ -1,9 +1,15 @@
 """ defines material semantic frame (MSF)
 """
 
-from agents.move import MoveType
+import base64
+from functools import cached_property
+
+from agents.move import MoveType, moves_by_conc, moves_by_prem
+from agents.bit_msf import BitMSF, bit_msf_from_sets, bit_msf_from_bytes, random_bit_msfs
 from utils.utils import wrap_list
-from utils.language_utils import possible_imp_generator, possible_inc_generator, exff_closure, co_closure, random_inc, random_imp_co_exff, exff_sets, co_generator, exff_generator
+from utils.bitmask_utils import set_to_mask
+from utils.language_tables import language_tables
+from utils.language_utils import possible_imp_generator, possible_inc_generator, exff_closure, co_closure, co_generator
 
 
 class MSF:
@@ -22,6 +28,9 @@ class MSF:
     inc : frozenset
         a set of incoherent sets. Each member of inc is a frozenset of integers. Each integer is an index for a
         sentence in the enumerated language.
+    bits : BitMSF, optional
+        the bitmask representation of the same imp and inc. It's built from imp and inc if not given. If it's given,
+        imp and inc may be None, and are then built from bits when first used.
 
     Attributes
     ----------
@@ -33,10 +42,15 @@ class MSF:
     inc : frozenset
         a set of incoherent sets. Each member of inc is a frozenset of integers. Each integer is an index for a
         sentence in the enumerated language.
+    exff : frozenset
+        the set of persistently incoherent sets in inc. It's computed once per MSF and is the lookup used by the
+        generators of exc, for_move and strange_imp.
     exc : dict
         a dictionary of exclusions. If \Gamma is incoherent, then for any \gamma in \Gamma, \Gamma - \gamma excludes
         \gamma. This dictionary maps the index of each sentence in the language to the set of sets of indexes of sentences
         that exclude this sentence. E.g. exc[2] = {{1},{3,4}}.
+    bits : BitMSF
+        the bitmask representation of this MSF. Stages use it for all subset and persistent incoherence tests.
     for_move : frozenset
         the set of all possible for moves in this MSF. each member of the set is an object of class MoveType with its
         val == 'reason for'. They correspond one to one with members of imp of this MSF.
@@ -50,22 +64,102 @@ class MSF:
         persistenlty incoherent set of commitment.
     code : str
         the code of a MSF can be used to regenerate the same MSF using decode_msf function. it's a string of form
-        'len' + n + 'imp' + m + 'inc' + s, where n is the length of language, m is the code for imp, s is the code for inc.
-
+        'msf' + s, where s is the base64 encoding of BitMSF.to_bytes.
+    move_dict : dict
+        the index of for_move and against_move by MoveType.key, i.e. (prem_mask, val, conc), see get_move.
+    for_move_by_conc, against_move_by_conc, move_by_conc : dict
+        map the index of each sentence to the tuple of for moves, against moves or all moves concluding it.
+    for_move_by_prem, against_move_by_prem : dict
+        map the index of each sentence to the tuple of for moves or against moves having it among their premises.
+
+    Every attribute other than lang, imp, inc and bits is derived from them and is only computed the first time it's
+    used, once per MSF. So building an MSF is cheap, and closure routines and batch generators only pay for the
+    attributes they read.
         """
-    def __init__(self, lang, imp, inc):
+    def __init__(self, lang, imp, inc, bits=None):
         self.lang = lang  # Enumerated Language, as a list of sentences
-        self.imp = imp  # Set of Implications
-        self.inc = inc  # Set of Incompatibilities
-        self.exff = exff_sets(self.lang, self.inc)
-        self.exc = self._exc_generator(self.lang, inc)  # Set of Exclusions
-        self.for_move = self._get_possible_for_moves(self.lang, imp, inc)
-        self.against_move = self._get_possible_against_moves(self.lang, inc)
-        self.strange_imp = self._get_strange_imp(self.lang, self.imp, self.inc)
-        self.code = self._code_msf(self.lang, self.imp, self.inc)
-        self.n_reasons = self._get_n_reasons(language=self.lang, for_moves=self.for_move, against_moves=self.against_move)
-        self.reason_ratio = self._reason_ratio_calculator(language = self.lang, for_moves=self.for_move, against_moves=self.against_move)
-        self.move_dict = self._move_dict_generator(self)
+        if imp is not None:
+            self.imp = imp  # Set of Implications
+        if inc is not None:
+            self.inc = inc  # Set of Incompatibilities
+        if bits is not None:
+            self.bits = bits  # Bitmask representation
+
+    @cached_property
+    def bits(self) -> BitMSF:
+        return bit_msf_from_sets(self.lang, self.imp, self.inc)
+
+    @cached_property
+    def _sets(self) -> tuple:
+        # imp and inc of an MSF made from a BitMSF alone.
+        return self.bits.to_sets()
+
+    @cached_property
+    def imp(self) -> frozenset:
+        return self._sets[0]
+
+    @cached_property
+    def inc(self) -> frozenset:
+        return self._sets[1]
+
+    @cached_property
+    def exff(self) -> frozenset:
+        # Set of persistently incoherent sets
+        return self._exff_generator(self.bits)
+
+    @cached_property
+    def exc(self) -> dict:
+        # Set of Exclusions
+        return self._exc_generator(self.bits)
+
+    @cached_property
+    def strange_imp(self) -> frozenset:
+        return self._get_strange_imp(self.lang, self.imp, self.exff)
+
+    @cached_property
+    def for_move(self) -> frozenset:
+        return self._get_possible_for_moves(self.lang, self.imp, self.exff, self.strange_imp)
+
+    @cached_property
+    def against_move(self) -> frozenset:
+        return self._get_possible_against_moves(self.lang, self.exc)
+
+    @cached_property
+    def code(self) -> str:
+        return self._code_msf(self.bits)
+
+    @cached_property
+    def n_reasons(self) -> dict:
+        return self._get_n_reasons(language=self.lang, for_moves=self.for_move, against_moves=self.against_move)
+
+    @cached_property
+    def reason_ratio(self) -> dict:
+        return self._reason_ratio_calculator(language = self.lang, for_moves=self.for_move, against_moves=self.against_move)
+
+    @cached_property
+    def move_dict(self) -> dict:
+        return self._move_dict_generator(self)
+
+    # Indexes of for_move and against_move, see agents.move.moves_by_conc and friends.
+    @cached_property
+    def for_move_by_conc(self) -> dict:
+        return moves_by_conc(self.for_move)
+
+    @cached_property
+    def against_move_by_conc(self) -> dict:
+        return moves_by_conc(self.against_move)
+
+    @cached_property
+    def move_by_conc(self) -> dict:
+        return moves_by_conc(frozenset.union(self.for_move, self.against_move))
+
+    @cached_property
+    def for_move_by_prem(self) -> dict:
+        return moves_by_prem(self.for_move)
+
+    @cached_property
+    def against_move_by_prem(self) -> dict:
+        return moves_by_prem(self.against_move)
 
     def show(self):
         """
@@ -144,7 +238,7 @@ class MSF:
 
         # Print out persistently incoherent sets.
         pinc = []
-        for i in exff_sets(self.lang, self.inc):
+        for i in self.exff:
             pinc.append(str(set(i)))
         pinc.sort()
         print('Among all incoherent sets, the following', len(pinc),' are persistently incoherent:')
@@ -182,7 +276,14 @@ class MSF:
 
         print("^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^End of a MSF display^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^")
 
-    def _exc_generator(self, lang: list, inc: frozenset) -> dict:
+    def _exff_generator(self, bits):
+        # The persistently incoherent sets are read off the bitmask representation, where they are computed once for
+        # all 2^n subsets. Every test of persistent incoherence in this MSF is a lookup in the frozenset returned here,
+        # or, for stages, in self.bits.
+        subsets = language_tables(bits.n).subsets
+        return frozenset(subsets[m] for m in bits.exff_masks())
+
+    def _exc_generator(self, bits) -> dict:
         """
         This generates a dictionary of exclusions for a language with a given inc. The return is completely decided by the
         input. However, this is no long simply a book-keeping. I have removed premises that are persistently incoherent
@@ -194,12 +295,8 @@ class MSF:
 
         Parameters
         ----------
-        lang : list
-            A list of strings, each string is a sentence.
-            e.g. ['a_0', 'a_1', 'a_2'] or ['red', 'Bob is nice', 'Yao is cool']
-        inc : frozenset
-            A frozenset of frozensets of intgers
-            each frozenset in it is a set of indexes of sentences of the language
+        bits : BitMSF
+            The bitmask representation of the MSF, whose exc_masks give the exclusions of each sentence.
 
         Returns
         -------
@@ -209,82 +306,51 @@ class MSF:
             that exclude this sentence. E.g. exc[2] = {{1},{3,4}}; this means that there are two and only two incoherent
             sets that contain the sentence indexe by 2, namely {1,2} and {2,3,4}
         """
-        exff = exff_sets(lang, inc)
-        result = dict()
-        for i in range(len(lang)):
-            against = []
-            for n in inc:
-                if i in n and n - frozenset([i]) not in exff and n - frozenset([i]) != set():
-                    against.append(n - frozenset([i]))
-            result[i] = frozenset(against)
-        return result
+        subsets = language_tables(bits.n).subsets
+        return {i: frozenset(subsets[m] for m in bits.exc_masks(i)) for i in range(bits.n)}
 
-    def _get_possible_for_moves(self, lang: list, imp: frozenset, inc: frozenset):
+    def _get_possible_for_moves(self, lang: list, imp: frozenset, exff: frozenset, strange_imp: frozenset):
         for_move = []
-        strange_imp = [] #Some implications are weird in the sense that the premises and conclusion are jointly
-                        #persistently in concsistent. We don't allow agents to use such imp in a for-move.
-        for i in imp:
-            if frozenset.union(i[0], frozenset([i[1]])) in exff_sets(lang, inc):
-                strange_imp.append(i)
-        pool = imp - co_generator(lang) - exff_generator(lang, inc) - frozenset(self._get_strange_imp(lang, imp, inc))
+        # An implication is pragmatically significant unless it's required by CO (its conclusion is among its premises),
+        # required by exff (its premises are persistently incoherent) or strange.
+        pool = [i for i in imp if i[1] not in i[0] and i[0] not in exff and i not in strange_imp]
         for i in pool:
-            for_move.append(MoveType(prem = i[0], val = 'reason for', conc = i[1], move_label = str(sorted({lang[i] for i in i[0]})) + ' entails ' + lang[i[1]]))
+            for_move.append(MoveType(prem = i[0], val = 'reason for', conc = i[1], lang = lang))
         return frozenset(for_move)
 
-    def _get_possible_against_moves(self, lang, inc):
+    def _get_possible_against_moves(self, lang, exc):
         against_move = []
-        exc = self._exc_generator(lang, inc)
         for i in range(len(lang)):
             for s in exc[i]:
-                against_move.append(MoveType(s, 'reason against', i, str(sorted({lang[n] for n in s})) + ' excludes ' + lang[i]))
+                against_move.append(MoveType(s, 'reason against', i, lang))
         return frozenset(against_move)
 
-    def _get_strange_imp(self, lang, imp, inc):
+    def _get_strange_imp(self, lang, imp, exff):
         # Some implications are weird in the sense that the premises and conclusion are jointly
         # persistently in concsistent. We don't allow agents to use such imp in a for-move.
         strange_imp = []
         for i in imp:
-            if i[0] not in exff_sets(lang, inc):
-                if frozenset.union(i[0], frozenset([i[1]])) in exff_sets(lang, inc):
+            if i[0] not in exff:
+                if frozenset.union(i[0], frozenset([i[1]])) in exff:
                     strange_imp.append(i)
         return frozenset(strange_imp)
 
-    def _code_msf(self, language, imp, inc):
+    def _code_msf(self, bits):
         """
-            This function generates a code for an MSF. It's intentionally made to asks for language, imp, inc as inputs,
-            instead of asking for an msf, to avoid circularity, as we use it in initializing the .code attribute of MSF.
+            This function generates a code for an MSF from its bitmask representation. The code is canonical, i.e. it
+            doesn't depend on the iteration order of imp or inc, and takes time linear in the size of the MSF.
 
             Parameters
             ----------
-            language : list
-                A list of strings, each string is a sentence. Namely, the enumerated language from which the original encoded MSF
-                was generated and the new recovered MSF will be generated.
-                e.g. ['a_0', 'a_1', 'a_2'] or ['red', 'Bob is nice', 'Yao is cool']
-            imp : frozenset
-                The frozenset of all implications of the original MSF.
-            inc : frozenset
-                The frozenset of all incoherent sets of the original MSF.
+            bits : BitMSF
+                The bitmask representation of the MSF.
 
             Returns
             -------
             str
-                The function returns a string of form 'len' + n + 'imp' + m + 'inc' + s, where n is the length of language,
-                m is the code for imp, s is the code for inc.
+                The function returns a string of form 'msf' + s, where s is the base64 encoding of bits.to_bytes().
             """
-
-        imp_code = str()
-        inc_code = str()
-        for i in list(possible_imp_generator(language)):
-            if i in imp:
-                imp_code = imp_code + '1'
-            else:
-                imp_code = imp_code + '0'
-        for i in list(possible_inc_generator(language)):
-            if i in inc:
-                inc_code = inc_code + '1'
-            else:
-                inc_code = inc_code + '0'
-        return 'len'+str(len(language))+'imp'+str(int(imp_code, 2))+'inc'+str(int(inc_code, 2))
+        return 'msf' + base64.b64encode(bits.to_bytes()).decode('ascii')
 
     def _get_n_reasons(self, language, for_moves, against_moves):
         n_reason_for = [0]*len(language)
@@ -303,13 +369,35 @@ class MSF:
         result['against'] = dct_n_reason_against
         return result
 
+    def get_move(self, prem, val, conc):
+        """
+        Look up a pragmatically significant move of this MSF in O(1).
+
+        Parameters
+        ----------
+        prem : frozenset or int
+            The premises, as a frozenset of indexes of sentences or as a mask.
+        val : str
+            'reason for' or 'reason against'.
+        conc : int
+            The index of the conclusion.
+
+        Returns
+        -------
+        MoveType or None
+            The move of this MSF with these premises, valence and conclusion, None if there is none.
+        """
+        if not isinstance(prem, int):
+            prem = set_to_mask(prem)
+        return self.move_dict.get((prem, val, conc))
+
     def _move_dict_generator(self, msf):
-        # keep a map from text representations of moves to the actual MoveType objects
+        # keep a map from (prem_mask, val, conc) to the MoveType objects of this MSF, see get_move
         move_dict = dict()
         for move in msf.for_move:
-            move_dict[move.to_text] = move
+            move_dict[move.key] = move
         for move in msf.against_move:
-            move_dict[move.to_text] = move
+            move_dict[move.key] = move
         return move_dict
 
     def _reason_ratio_calculator(self, language, for_moves, against_moves):
@@ -342,8 +430,9 @@ def decode_msf(language, code):
         A list of strings, each string is a sentence. Namely, the enumerated language from which the original encoded MSF
         was generated and the new recovered MSF will be generated.
         e.g. ['a_0', 'a_1', 'a_2'] or ['red', 'Bob is nice', 'Yao is cool']
-    code : str
-        A str for coding an MSF.
+    code : str or bytes
+        A str for coding an MSF, i.e. the .code of an MSF, or the bytes of BitMSF.to_bytes. Codes of the older form
+        'len' + n + 'imp' + m + 'inc' + s are also accepted.
 
     Returns
     -------
@@ -351,7 +440,29 @@ def decode_msf(language, code):
         An MSF identical to the originally encoded MSF. Note that they are identical in the sense that all artributes of
         them are the same. But they typically do not have the same identity assigned by Python.
     """
+    if isinstance(code, str) and code.startswith('len'):
+        return _decode_legacy_msf(language, code)
+
+    bits = decode_msf_bits(code)
+    if bits.n != len(language):
+        print('Error: This code only works for language with', bits.n, 'sentences.')
+    else:
+        return msf_from_bits(language, bits)
 
+
+def decode_msf_bits(code) -> BitMSF:
+    """
+    This function decodes the .code of an MSF, or the bytes of BitMSF.to_bytes, straight into the bitmask
+    representation, without building any frozenset or MoveType.
+    """
+    if isinstance(code, str):
+        code = base64.b64decode(code[3:])
+    return bit_msf_from_bytes(code)
+
+
+def _decode_legacy_msf(language, code):
+    # Codes of the form 'len' + n + 'imp' + m + 'inc' + s, where m and s are the binary strings of membership in
+    # possible_imp_generator and possible_inc_generator, in their iteration order, read as decimal integers.
     lang_len = int(code[3 : code.find('imp')])
     if lang_len != len(language):
         print('Error: This code only works for language with', lang_len, 'sentences.')
@@ -373,6 +484,28 @@ def decode_msf(language, code):
         return MSF(language, frozenset(imp), frozenset(inc))
 
 
+def msf_from_bits(language: list, bits: BitMSF) -> MSF:
+    """
+    Generate an MSF from its bitmask representation.
+
+    Parameters
+    ----------
+    language : list
+        A list of strings, each string is a sentence.
+        e.g. ['a_0', 'a_1', 'a_2'] or ['red', 'Bob is nice', 'Yao is cool']
+    bits : BitMSF
+        The bitmask representation of the MSF. Its n must be the length of language.
+
+    Returns
+    -------
+    MSF
+        An MSF sharing the given BitMSF as its .bits attribute. Its imp and inc are only built when first used.
+    """
+    if bits.n != len(language):
+        raise ValueError(f"Error: This BitMSF only works for language with {bits.n} sentences.")
+    return MSF(language, None, None, bits=bits)
+
+
 def random_msf(language, imp_size = 'random', imp_chance = 0.5, inc_size = 'random', inc_chance = 0.5):
     """
     Generate a random msf according to parameters provided.
@@ -414,9 +547,22 @@ def random_msf(language, imp_size = 'random', imp_chance = 0.5, inc_size = 'rand
         a frozenset set of sets of integers. It contains all subsets of the (indexes of the) enumerated language, except
         all singletons, since we assume singletons are always coherent.
     """
-    inc = random_inc(language = language, size = inc_size, chance = inc_chance)
-    imp = random_imp_co_exff(language = language, inc = inc, imp_size = imp_size, imp_chance = imp_chance)
-    return MSF(language, imp, inc)
+    return random_msfs(language, 1, imp_size = imp_size, imp_chance = imp_chance, inc_size = inc_size, inc_chance = inc_chance)[0]
+
+
+def random_msfs(language, n_msfs, imp_size = 'random', imp_chance = 0.5, inc_size = 'random', inc_chance = 0.5):
+    """
+    Generate a batch of random msfs in one call, see random_msf for the parameters. The imps and incs of all of them are
+    sampled at once as bit arrays, see agents.bit_msf.random_bit_msfs.
+
+    Returns
+    -------
+    list
+        a list of n_msfs MSFs.
+    """
+    return [msf_from_bits(language, bits) for bits in random_bit_msfs(len(language), n_msfs, imp_size = imp_size,
+                                                                      imp_chance = imp_chance, inc_size = inc_size,
+                                                                      inc_chance = inc_chance)]
 
 
 def msf_closure(language: list, imp: frozenset, inc: frozenset):
@@ -0,0 +1,52 @@
+""" defines scores of candidate moves, computed for a whole batch of moves at once, for policies to choose by
+"""
+
+import numpy as np
+
+from utils.language_tables import language_tables
+
+
+# Whose commitments new commitments are counted against: the next mover's own, or its opponent's.
+SCORE_REFERENCES = ('mover', 'opponent')
+
+
+def new_commitments(stage, moves, reference: str = 'mover') -> dict:
+    """
+    Compute what each of the moves would add to the commitments of an agent, if the next mover made it after stage.
+    A reason-for commits to accept its premises and conclusion, a reason-against commits to accept its premises and
+    to reject its conclusion, and only the commitments the agent doesn't have yet are new. All moves are scored in one
+    pass over arrays of masks (see utils.bitmask_utils), so a policy can compare them without making a frozenset per
+    move.
+
+    Parameters
+    ----------
+    stage : Stage
+        The stage after which the next mover is to move.
+    moves : list
+        The moves to score, e.g. the available moves of stage.
+    reference : str
+        'mover' to count the new commitments of the next mover, as the minimize_ac policy does, or 'opponent' to
+        count what the moves would add to the commitments of its opponent.
+
+    Returns
+    -------
+    dict
+        'ac' and 'rc': arrays of the masks of the new acceptance and rejection commitments, 'n_ac' and 'n_rc': arrays
+        of their sizes, all in the order of moves.
+    """
+    if reference not in SCORE_REFERENCES:
+        raise ValueError(f"Error: Commitments must be counted against one of {SCORE_REFERENCES}.")
+    # stage.agent made the last move, so CR is the next mover after CL and the other way around.
+    if (stage.agent == 'CL') == (reference == 'mover'):
+        score = stage.f_score_sit.cr
+    else:
+        score = stage.f_score_sit.cl
+
+    prem = np.fromiter((m.prem_mask for m in moves), dtype=np.int64, count=len(moves))
+    conc = np.left_shift(1, np.fromiter((m.conc for m in moves), dtype=np.int64, count=len(moves)))
+    against = np.fromiter((m.val == 'reason against' for m in moves), dtype=bool, count=len(moves))
+
+    ac = np.where(against, prem, prem | conc) & ~score.ac_mask
+    rc = np.where(against, conc, 0) & ~score.rc_mask
+    mask_sizes = language_tables(len(stage.msf.lang)).mask_sizes
+    return {'ac': ac, 'rc': rc, 'n_ac': mask_sizes[ac], 'n_rc': mask_sizes[rc]}
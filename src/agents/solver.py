@@ -0,0 +1,172 @@
+""" defines an exhaustive solver of inquiries, which finds the verdict on a proposal under optimal play
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from utils.env_utils import switch_agents
+from env.stage import VERDICT_VALUES
+from env.game_tree import first_position
+
+
+# The verdict of a value, see env.stage.VERDICT_VALUES.
+VALUE_VERDICTS = {value: verdict for verdict, value in VERDICT_VALUES.items()}
+
+# How many positions a worker of solve solves between two checks of whether it's been told to stop, see _solve_parallel.
+STOP_CHECK_INTERVAL = 1024
+
+
+class _Stopped(Exception):
+    pass
+
+
+# In the workers of solve, the event that tells them to stop. None in any other process.
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def solve(msf, cl_inferential_theory, cr_inferential_theory, proposal, n_workers: int = 1) -> dict:
+    """
+    Solve the inquiry that starts with CL making proposal: search the whole game tree, i.e. every way the inquiry can
+    go on through the available moves, for the verdict on proposal when CL and CR both play their best. Positions
+    (see env.game_tree) are memoized by their keys, so a position reached by moves in different orders is solved
+    once, and the search stops looking at the moves of a position as soon as one of them wins for the mover.
+
+    With more than one worker, each of CR's replies to the proposal is solved in its own process. Workers don't
+    share their memos, so more positions are visited in total than by a single process.
+
+    Parameters
+    ----------
+    msf : MSF
+        The MSF of the inquiry.
+    cl_inferential_theory : InferentialTheory
+        CL's inferential theory.
+    cr_inferential_theory : InferentialTheory
+        CR's inferential theory.
+    proposal : MoveType
+        CL's first move.
+    n_workers : int
+        The number of worker processes. If 1, everything is solved in this process. If None, the number of CPUs.
+
+    Returns
+    -------
+    dict
+        'verdict': 'sustain' or 'fail', the verdict on proposal under optimal play.
+        'principal_variation': a list of moves, starting with proposal, along which both agents play their best until
+        the inquiry is over.
+        'n_nodes': the number of positions solved, i.e. whose moves were looked at.
+        'n_memo_hits': the number of times a position was found already solved.
+    """
+    root = first_position(msf, cl_inferential_theory, cr_inferential_theory, proposal)
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    if n_workers == 1:
+        counts = [0, 0]
+        memo = dict()
+        value = _solve(root, memo, counts)
+        pv = [proposal] + _principal_variation(root, memo)
+    else:
+        value, pv, counts = _solve_parallel(root, n_workers)
+
+    return {'verdict': VALUE_VERDICTS[value], 'principal_variation': pv, 'n_nodes': counts[0],
+            'n_memo_hits': counts[1]}
+
+
+def solve_subtree(msf, cl_inferential_theory, cr_inferential_theory, proposal, move) -> tuple:
+    """
+    Solve the inquiry after CL makes proposal and CR replies with move. This is what the workers of solve do.
+
+    Returns
+    -------
+    tuple
+        (value, principal_variation, counts), with value 1 for 'sustain' and 0 for 'fail', principal_variation
+        starting with move and counts [n_nodes, n_memo_hits].
+    """
+    position = first_position(msf, cl_inferential_theory, cr_inferential_theory, proposal).move(move)
+    counts = [0, 0]
+    memo = dict()
+    value = _solve(position, memo, counts)
+    return value, [move] + _principal_variation(position, memo), counts
+
+
+def _solve_parallel(root, n_workers):
+    # CR moves after the proposal, so it wants the lowest value. Once a reply makes the proposal fail, the replies
+    # that haven't been solved yet don't matter and are given up. Among the replies solved, the first one in the
+    # order of available_moves with the best value gives the principal variation.
+    moves = root.available_moves()
+    if not moves:
+        return VERDICT_VALUES[root.verdict()], [root.proposal], [1, 0]
+
+    counts = [1, 0]
+    results = dict()
+    stop_event = multiprocessing.Event()
+    executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(stop_event,))
+    try:
+        futures = [executor.submit(solve_subtree, root.msf, root.cl_inferential_theory, root.cr_inferential_theory,
+                                   root.proposal, m) for m in moves]
+        index = {f: i for i, f in enumerate(futures)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                results[index[f]] = f.result()
+                counts[0] += results[index[f]][2][0]
+                counts[1] += results[index[f]][2][1]
+            if any(results[i][0] == 0 for i in results):
+                break
+    finally:
+        # The workers still solving replies give up at their next check of stop_event, see _solve, and the replies
+        # not started yet are cancelled, so shutting down doesn't wait for the slowest reply.
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    value = min(results[i][0] for i in results)
+    pv = results[min(i for i in results if results[i][0] == value)][1]
+    return value, [root.proposal] + pv, counts
+
+
+def _solve(position, memo, counts):
+    # The value of position under optimal play. memo maps the keys of solved positions to their value and the best
+    # move there.
+    entry = memo.get(position.key)
+    if entry is not None:
+        counts[1] += 1
+        return entry[0]
+    counts[0] += 1
+    if _stop_event is not None and not counts[0] % STOP_CHECK_INTERVAL and _stop_event.is_set():
+        raise _Stopped()
+
+    moves = position.available_moves()
+    if not moves:
+        value, best_move = VERDICT_VALUES[position.verdict()], None
+    else:
+        # CL wants the highest value and CR the lowest. Values are 0 or 1, so a move worth 1 to CL (0 to CR) can't be
+        # beaten and the remaining moves are skipped.
+        maximize = switch_agents(position.agent) == 'CL'
+        goal = 1 if maximize else 0
+        value, best_move = None, None
+        for m in moves:
+            child_value = _solve(position.move(m), memo, counts)
+            if value is None or (child_value > value if maximize else child_value < value):
+                value, best_move = child_value, m
+            if value == goal:
+                break
+    memo[position.key] = (value, best_move)
+    return value
+
+
+def _principal_variation(position, memo):
+    # Follows the best moves in memo from position until the inquiry is over.
+    pv = []
+    best_move = memo[position.key][1]
+    while best_move is not None:
+        pv.append(best_move)
+        position = position.move(best_move)
+        best_move = memo[position.key][1]
+    return pv
@@ -2,6 +2,7 @@
 """
 
 from agents.msf import MSF, exff_closure
+from agents.closure import close, close_sets
 
 
 def cm_imp_closure_once(input_imp):
@@ -76,10 +77,8 @@ def cm_imp_closure(input_imp):
         A frozenset set of implications. Namely, the one obtained by closing the input_imp under CM until the fixed point
         is reached.
     """
-    result = cm_imp_closure_once(input_imp)
-    while len(result) != len(cm_imp_closure_once(result)):
-        result = cm_imp_closure_once(result)
-    return result
+    # See agents.closure, which only joins newly derived implications with the rest.
+    return close_sets(None, input_imp, frozenset(), ['cm_imp'])[0]
 
 
 def cm_inc_closure_once(input_imp, input_inc):
@@ -134,10 +133,7 @@ def cm_inc_closure(input_imp, input_inc):
         A frozenset set of incoherent. Namely, the one obtained by closing the input_inc under CM with respect to the
         input_imp until a fixed point is reached.
     """
-    result = cm_inc_closure_once(input_imp, input_inc)
-    while len(result) != len(cm_inc_closure_once(input_imp, result)):
-        result = cm_inc_closure_once(input_imp, result)
-    return result
+    return close_sets(None, input_imp, input_inc, ['cm_inc'])[1]
 
 
 def msf_cm_full_closure_once(frame):
@@ -149,12 +145,8 @@ def msf_cm_full_closure_once(frame):
     # We consider closing under cm_imp, cm_inc, exff in turn as closing under cm once. Strictly speaking, it doesn't
     # make too much sense of closing once, since, e.g., exff apparently creates more implications that will produce more
     # imcoherent sets under CM.
-    return MSF(lang = frame.lang, imp = exff_imp_first_time, INC = cm_inc_first_time)
+    return MSF(lang = frame.lang, imp = exff_imp_first_time, inc = cm_inc_first_time)
 
 
 def msf_cm_full_closure(frame):
-    result = msf_cm_full_closure_once(frame)
-    while len(result.imp) != len(msf_cm_full_closure_once(result).imp) or len(result.inc) != len(msf_cm_full_closure_once(result).inc):
-        result = msf_cm_full_closure_once(result)
-    return result
-
+    return close(frame, ['cm', 'exff'])
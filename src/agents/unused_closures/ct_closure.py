@@ -2,7 +2,8 @@
 """
 
 from agents.msf import MSF, exff_closure
-from cm_closure import cm_imp_closure, cm_imp_closure_once, cm_inc_closure, cm_inc_closure_once, msf_cm_full_closure, msf_cm_full_closure_once
+from agents.closure import close, close_sets
+from agents.unused_closures.cm_closure import cm_imp_closure, cm_imp_closure_once, cm_inc_closure, cm_inc_closure_once, msf_cm_full_closure, msf_cm_full_closure_once
 
 
 def ct_imp_closure_once(input_imp):
@@ -16,10 +17,8 @@ def ct_imp_closure_once(input_imp):
 
 
 def ct_imp_closure(input_imp):
-    result = ct_imp_closure_once(input_imp)
-    while len(result) != len(ct_imp_closure_once(result)):
-        result = ct_imp_closure_once(result)
-    return result
+    # See agents.closure, which only joins newly derived implications with the rest.
+    return close_sets(None, input_imp, frozenset(), ['ct_imp'])[0]
 
 
 def ct_inc_closure_once(input_imp, input_inc):
@@ -32,10 +31,7 @@ def ct_inc_closure_once(input_imp, input_inc):
 
 
 def ct_inc_closure(input_imp, input_inc):
-    result = ct_inc_closure_once(input_imp, input_inc)
-    while len(result) != len(ct_inc_closure_once(input_imp, result)):
-        result = ct_inc_closure_once(input_imp, result)
-    return result
+    return close_sets(None, input_imp, input_inc, ['ct_inc'])[1]
 
 
 def msf_ct_full_closure_once(frame):
@@ -46,10 +42,7 @@ def msf_ct_full_closure_once(frame):
 
 
 def msf_ct_full_closure(frame):
-    result = msf_ct_full_closure_once(frame)
-    while len(result.imp) != len(msf_ct_full_closure_once(result).imp) or len(result.inc) != len(msf_ct_full_closure_once(result).inc):
-        result = msf_ct_full_closure_once(result)
-    return result
+    return close(frame, ['ct', 'exff'])
 
 
 def unused_msf_closure(frame, close_under, times = 1):
@@ -74,10 +67,7 @@ def unused_msf_closure(frame, close_under, times = 1):
         elif close_under == 'ct':
             return msf_ct_full_closure(frame)
         elif close_under == 'cm and ct':
-            result = msf_ct_full_closure(msf_cm_full_closure(frame))
-            while len(result.imp) != len(msf_ct_full_closure(msf_cm_full_closure(result)).imp) or len(result.inc) != len(msf_ct_full_closure(msf_cm_full_closure(result)).inc):
-                result = msf_ct_full_closure(msf_cm_full_closure(result))
-            return result
+            return close(frame, ['cm', 'ct', 'exff'])
         else:
             print('This function requires a parameter close_under, which can take value from the following strings: '
                   '\'cm_imp\', \'cm_inc\', \'cm\', \'ct_imp\', \'ct_inc\', \'ct\', \'cm and ct\'.'
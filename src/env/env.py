@@ -10,6 +10,7 @@ from agents.inferential_theory import InferentialTheory
 from agents.agent import Agent
 from env.score import Score, ScoreSit
 from env.stage import Stage, initial_next_stage_2
+from env.suff_con import SuffCon
 
 
 import pdb
@@ -25,6 +26,8 @@ class Environment:
                 cr_inferential_theory_name: str = "default",
                 cl_policy_name: str = "one_step_ahead",
                 cr_policy_name: str = "minimize_ac",
+                cl_policy_kwargs: dict = None,
+                cr_policy_kwargs: dict = None,
                 ):
 
         # build env goals
@@ -43,6 +46,8 @@ class Environment:
         self.cr_inferential_theory_name = cr_inferential_theory_name
         self.cl_policy_name = cl_policy_name
         self.cr_policy_name = cr_policy_name
+        self.cl_policy_kwargs = cl_policy_kwargs
+        self.cr_policy_kwargs = cr_policy_kwargs
         self.cl_agent = None
         self.cr_agent = None
         self.icg = None
@@ -65,8 +70,8 @@ class Environment:
         self.msf = random_msf(language=self.language)
 
     def _build_agents(self):
-        self.cl_agent = Agent(self.msf, policy_name=self.cl_policy_name, inferential_theory_name=self.cl_inferential_theory_name, target=self.target, proposal=self.proposal, goal=self.goal)
-        self.cr_agent = Agent(self.msf, policy_name=self.cr_policy_name, inferential_theory_name=self.cr_inferential_theory_name, target=self.target, proposal=self.proposal, goal=self.goal)
+        self.cl_agent = Agent(self.msf, policy_name=self.cl_policy_name, inferential_theory_name=self.cl_inferential_theory_name, target=self.target, proposal=self.proposal, goal=self.goal, policy_kwargs=self.cl_policy_kwargs)
+        self.cr_agent = Agent(self.msf, policy_name=self.cr_policy_name, inferential_theory_name=self.cr_inferential_theory_name, target=self.target, proposal=self.proposal, goal=self.goal, policy_kwargs=self.cr_policy_kwargs)
 
         self.icg = self._get_inferential_common_ground(
             cl_inferential_theory=self.cl_agent.inferential_theory,
@@ -133,12 +138,12 @@ class Environment:
             f_score = ScoreSit(Score(subject = 'CL', ac = frozenset.union(move.prem, frozenset([move.conc])),
                             rc = frozenset(), ae = frozenset.union(move.prem, frozenset([move.conc])),
                             re = frozenset()), self.empty_score_cr)
-            suff_con_prefix = [('A', move.prem, 'A', move.conc)]
+            suff_con_prefix = [('A', move.prem_mask, 'A', move.conc)]
             move_set = cl_inferential_theory.for_move
 
         elif argue_for_or_against == "against":
             f_score = ScoreSit(Score('CL', move.prem, frozenset([move.conc]), move.prem, frozenset([move.conc])), self.empty_score_cr)
-            suff_con_prefix = [('A', move.prem, 'R', move.conc)]
+            suff_con_prefix = [('A', move.prem_mask, 'R', move.conc)]
             move_set = cl_inferential_theory.against_move
 
         scon = []
@@ -146,14 +151,14 @@ class Environment:
             print('The given first move is not in CL\'s Inferential Theory.')
         else:
             for i in move.prem:
-                scon.append(('A', move.prem, 'A', i))
+                scon.append(('A', move.prem_mask, 'A', i))
 
             # Here it's important to have scon second, instead of first.
             suff_con = suff_con_prefix + scon
 
         next_stage = Stage(msf=frame, turn_idx=self.stage_idx, agent='CL', a_score_sit=self.empty_score_sit, target_move=None,
                     prag_sig='proposal', prime_move=move, f_score_sit=f_score, prev_stage=None,
-                    contro_set=frozenset([move.conc]), suff_con=suff_con,
+                    contro_set=frozenset([move.conc]), suff_con=SuffCon(suff_con),
                     cl_inferential_theory=cl_inferential_theory, cr_inferential_theory=cr_inferential_theory)
 
         return next_stage
@@ -209,7 +214,7 @@ class Environment:
 
         final_stage = self.stage_list[-1]
 
-        common_ground = frozenset.intersection(final_stage.f_score_sit.cl.ac, final_stage.f_score_sit.cr.ac)
+        common_ground = final_stage.f_score_sit.common_ground
 
         print('The propositional common ground is', list(common_ground))
 
@@ -0,0 +1,151 @@
+""" defines compact episode records and sinks that stream them to disk
+"""
+
+import json
+
+
+def episode_record(env, episode_idx: int = None, seed: int = None) -> dict:
+    """summarizes a finished episode as a small dict of plain values, so that the Environment can be dropped
+
+    Args:
+        env: the Environment of a finished episode
+        episode_idx: the index of the episode in its batch, if any
+        seed: the seed the episode was run with, if any
+
+    Returns:
+        dict: the episode setup (MSF code, seed, policies and inferential theory names, goal), the proposal as a short
+        label and, with one entry per turn, the moves as short labels, their pragmatic significance, the turn they target, the scores and the
+        verdicts. Each score is the list [cl_ac, cl_rc, cl_ae, cl_re, cr_ac, cr_rc, cr_ae, cr_re] of bitmasks,
+        see utils.bitmask_utils.
+    """
+    scores = []
+    for stage in env.stage_list:
+        cl = stage.f_score_sit.cl
+        cr = stage.f_score_sit.cr
+        scores.append([cl.ac_mask, cl.rc_mask, cl.ae_mask, cl.re_mask, cr.ac_mask, cr.rc_mask, cr.ae_mask, cr.re_mask])
+
+    return {
+        'episode_idx': episode_idx,
+        'seed': seed,
+        'msf_code': env.msf.code,
+        'n_sentences': len(env.msf.lang),
+        'goal': env.goal,
+        'proposal': env.stage_list[0].proposal.short_label,
+        'cl_policy_name': env.cl_policy_name,
+        'cr_policy_name': env.cr_policy_name,
+        'cl_inferential_theory_name': env.cl_inferential_theory_name,
+        'cr_inferential_theory_name': env.cr_inferential_theory_name,
+        'moves': [stage.prime_move.short_label for stage in env.stage_list],
+        'prag_sigs': [stage.prag_sig for stage in env.stage_list],
+        'target_turns': [None if stage.target_move is None else stage.target_move.turn_idx for stage in env.stage_list],
+        'scores': scores,
+        'verdicts': list(env.stage_verdict_list),
+        'verdict': env.stage_verdict_list[-1],
+    }
+
+
+def error_record(episode_idx: int, seed: int, error: BaseException) -> dict:
+    """summarizes an episode that failed, so that a batch goes on without it and the episode can be re-run from its seed
+
+    Args:
+        episode_idx: the index of the episode in its batch
+        seed: the seed the episode was run with
+        error: the exception the episode raised
+
+    Returns:
+        dict: episode_idx, seed and the error as 'ExceptionType: message'. The fields of episode_record are left out.
+    """
+    return {
+        'episode_idx': episode_idx,
+        'seed': seed,
+        'error': f'{type(error).__name__}: {error}',
+    }
+
+
+class JsonlEpisodeSink:
+    """
+    writes episode records as JSON lines, one line per record, flushing after each so that a crashed batch keeps
+    everything written so far
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w')
+
+    def write(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetEpisodeSink:
+    """
+    writes episode records to a Parquet file, one row group per batch_size records, so that memory stays bounded by
+    batch_size records however many episodes are written. Requires pyarrow.
+    """
+    def __init__(self, path, batch_size: int = 1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Error: Writing episode records to Parquet requires pyarrow. Use a .jsonl path instead, or install pyarrow.")
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('episode_idx', pa.int64()),
+            ('seed', pa.int64()),
+            ('msf_code', pa.string()),
+            ('n_sentences', pa.int64()),
+            ('goal', pa.string()),
+            ('proposal', pa.string()),
+            ('cl_policy_name', pa.string()),
+            ('cr_policy_name', pa.string()),
+            ('cl_inferential_theory_name', pa.string()),
+            ('cr_inferential_theory_name', pa.string()),
+            ('moves', pa.list_(pa.string())),
+            ('prag_sigs', pa.list_(pa.string())),
+            ('target_turns', pa.list_(pa.int64())),
+            ('scores', pa.list_(pa.list_(pa.int64()))),
+            ('verdicts', pa.list_(pa.string())),
+            ('verdict', pa.string()),
+            ('error', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def write(self, record: dict) -> None:
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self.buffer:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_episode_sink(path: str):
+    """opens the sink matching the extension of path: .parquet for ParquetEpisodeSink, anything else for JsonlEpisodeSink
+    """
+    if path.endswith('.parquet'):
+        return ParquetEpisodeSink(path)
+    else:
+        return JsonlEpisodeSink(path)
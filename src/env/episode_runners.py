@@ -1,7 +1,14 @@
 """ defines functions to run environment episodes
 """
 
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
 from env.env import Environment
+from env.episode_records import episode_record, error_record
 import pdb
 
 
@@ -15,7 +22,8 @@ def run_episode(args: object):
         _type_: _description_
     """
 
-    env = Environment(args.lang, args.target, args.proposal, args.goal, args.cl_inferential_theory_name, args.cr_inferential_theory_name, args.cl_policy_name, args.cr_policy_name)
+    env = Environment(args.lang, args.target, args.proposal, args.goal, args.cl_inferential_theory_name, args.cr_inferential_theory_name, args.cl_policy_name, args.cr_policy_name,
+                      getattr(args, 'cl_policy_kwargs', None), getattr(args, 'cr_policy_kwargs', None))
 
     # run the episode
     done = False
@@ -24,6 +32,10 @@ def run_episode(args: object):
     while not done:
         curr_agent = env.get_curr_agent(curr_stage)
         action = curr_agent.get_action(curr_stage)
+        if action is None:
+            # The agent to move has no available move, which Environment._get_done_status doesn't check right after the
+            # proposal, so the inquiry ends there.
+            break
         next_stage, done = env.step(action)
 
         # update for next loop
@@ -32,6 +44,78 @@ def run_episode(args: object):
     return env
 
 
+def episode_seed(seed: int, episode_idx: int) -> int:
+    """deterministic seed of a single episode in a batch, so that results don't depend on which worker runs it
+
+    Args:
+        seed: the seed of the whole batch
+        episode_idx: the index of the episode in the batch
+
+    Returns:
+        int: a seed usable by both random.seed and numpy.random.seed
+    """
+    return int(np.random.SeedSequence([seed, episode_idx]).generate_state(1)[0])
+
+
+def run_seeded_episode(args: object, episode_idx: int, seed: int) -> dict:
+    """runs a single dialogue with both random and numpy.random seeded, and summarizes it
+
+    Args:
+        args: object class that contains the env setup args as attributes
+        episode_idx: the index of the episode in its batch
+        seed: the seed of this episode
+
+    Returns:
+        dict: the episode_record of the dialogue, so that the Environment itself never leaves the worker
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    env = run_episode(args)
+    return episode_record(env, episode_idx=episode_idx, seed=seed)
+
+
+def run_episode_batch(args: object, n_episodes: int, seed: int = 0, n_workers: int = None, max_pending: int = None):
+    """runs many dialogues across a process pool, yielding each result as soon as it finishes
+
+    Args:
+        args: object class that contains the env setup args as attributes. It's sent to the workers, so it must be picklable.
+        n_episodes: number of episodes to run
+        seed: the seed of the batch. Episode i is run with episode_seed(seed, i), whichever worker runs it.
+        n_workers: number of worker processes, defaults to the number of CPUs
+        max_pending: maximum number of episodes submitted but not yet yielded, which bounds memory for large batches.
+            Defaults to four per worker.
+
+    Yields:
+        dict: the result of run_seeded_episode for each episode, in order of completion. An episode that raised gets an
+            error_record instead, and the batch goes on.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if max_pending is None:
+        max_pending = 4 * n_workers
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        episode_idx = 0
+        pending = set()
+        # The index and seed of each pending episode, for the error_record if it fails.
+        submitted = dict()
+        while episode_idx < n_episodes or pending:
+            while episode_idx < n_episodes and len(pending) < max_pending:
+                curr_seed = episode_seed(seed, episode_idx)
+                future = executor.submit(run_seeded_episode, args, episode_idx, curr_seed)
+                submitted[future] = (episode_idx, curr_seed)
+                pending.add(future)
+                episode_idx += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, curr_seed = submitted.pop(future)
+                try:
+                    record = future.result()
+                except Exception as error:
+                    record = error_record(idx, curr_seed, error)
+                yield record
+
+
 def run_episode_from_stage(orig_inq, stage_num, next_stage_flag = None, cl_strategy = None, cr_strategy = None):
     if not cl_strategy:
         cl_strategy = orig_inq.cl_strategy
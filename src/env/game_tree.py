@@ -0,0 +1,167 @@
+""" defines a lightweight representation of the positions of an inquiry, for searching its game tree
+"""
+
+import random
+
+from utils.env_utils import switch_agents
+from utils.bitmask_utils import set_to_mask
+from env.stage import scores_after, compute_entitlements, verdict_from_masks, _local_candidates, _available_among, \
+    _move_suff_con, _move_commitments
+
+
+class Position:
+    """
+    A class used to represent where an inquiry stands, keeping only what the rest of the inquiry depends on. Unlike a
+    Stage, a Position has no scores as frozensets, no target stage, no pragmatic significance and no link to the
+    previous stage, so making a move is a few integer operations and a lookup in the transposition table of
+    scores_after. Search policies use Positions to look ahead and only ever make a Stage for the move they choose.
+
+    Parameters
+    ----------
+    msf : MSF
+        The MSF of the inquiry.
+    cl_inferential_theory : InferentialTheory
+        CL's inferential theory.
+    cr_inferential_theory : InferentialTheory
+        CR's inferential theory.
+    proposal : MoveType
+        The first move of the inquiry, whose verdict is at stake.
+    agent : str
+        The agent who made the last move, 'CL' or 'CR'.
+    masks : tuple
+        (cl_ac, cl_rc, cl_ae, cl_re, cr_ac, cr_rc, cr_ae, cr_re) as bitmasks, see utils.bitmask_utils.
+    controv : int
+        The bitmask of controversial sentences.
+    suff_con : tuple
+        The sufficient conditions, in order, without earlier copies of repeated ones. See Stage.position_key.
+    used_moves : frozenset
+        All moves made so far.
+
+    Attributes
+    ----------
+    position_key : tuple
+        As in Stage.position_key, so that Positions and Stages share the table of scores_after.
+    key : tuple
+        Everything the rest of the inquiry depends on, given the MSF, the inferential theories and the proposal. Two
+        Positions with the same key have the same game tree below them.
+    """
+    __slots__ = ('msf', 'cl_inferential_theory', 'cr_inferential_theory', 'proposal', 'agent', 'masks', 'controv',
+                 'suff_con', 'used_moves', 'position_key', 'key', '_moves')
+
+    def __init__(self, msf, cl_inferential_theory, cr_inferential_theory, proposal, agent, masks, controv, suff_con,
+                 used_moves):
+        self.msf = msf
+        self.cl_inferential_theory = cl_inferential_theory
+        self.cr_inferential_theory = cr_inferential_theory
+        self.proposal = proposal
+        self.agent = agent
+        self.masks = masks
+        self.controv = controv
+        self.suff_con = suff_con
+        self.used_moves = used_moves
+        self.position_key = (agent, masks[0], masks[1], masks[4], masks[5], controv, suff_con)
+        self.key = (agent, masks, controv, suff_con, used_moves)
+        self._moves = None
+
+    def available_moves(self) -> tuple:
+        """ This gives the moves available to the next mover, the same as Stage.available_moves, sorted by key """
+        if self._moves is None:
+            if self.agent == 'CL':
+                theory, own, opp = self.cr_inferential_theory, self.masks[4:8], self.masks[0:4]
+            else:
+                theory, own, opp = self.cl_inferential_theory, self.masks[0:4], self.masks[4:8]
+            candidates = _local_candidates(theory, own[0], own[1], own[2], opp[2], 1 << self.proposal.conc)
+            avail_for_move, avail_against_move = _available_among(candidates, self.msf.bits, own[0], self.used_moves)
+            self._moves = tuple(sorted(avail_for_move + avail_against_move, key=lambda m: m.key))
+        return self._moves
+
+    def is_over(self) -> bool:
+        # The inquiry is over when the next mover has no move left, see Environment._get_done_status.
+        return not self.available_moves()
+
+    def verdict(self) -> str:
+        # The verdict on the proposal, as in utils.env_utils.get_verdict.
+        return verdict_from_masks(self.proposal, self.masks[2], self.masks[3])
+
+    def move(self, move):
+        """ This gives the Position after the next mover makes move, which must be one of available_moves """
+        suff_con = _move_suff_con(move)
+        # The new sufficient conditions come last, so their earlier copies are dropped.
+        new = set(suff_con)
+        suff_con = tuple([i for i in self.suff_con if i not in new] + suff_con)
+        return Position(self.msf, self.cl_inferential_theory, self.cr_inferential_theory, self.proposal,
+                        switch_agents(self.agent), scores_after(self, move), self.controv | 1 << move.conc, suff_con,
+                        self.used_moves | frozenset([move]))
+
+
+def position_from_stage(stage) -> Position:
+    """ This gives the Position of an inquiry at the given stage """
+    cl, cr = stage.f_score_sit.cl, stage.f_score_sit.cr
+    masks = (cl.ac_mask, cl.rc_mask, cl.ae_mask, cl.re_mask, cr.ac_mask, cr.rc_mask, cr.ae_mask, cr.re_mask)
+    return Position(stage.msf, stage.cl_inferential_theory, stage.cr_inferential_theory, stage.proposal, stage.agent, masks,
+                    set_to_mask(stage.contro_set), stage.position_key[6], stage.used_moves)
+
+
+def first_position(msf, cl_inferential_theory, cr_inferential_theory, proposal) -> Position:
+    """ This gives the Position after CL makes proposal as the first move, as in Environment._first_step """
+    if proposal.val == 'reason against':
+        masks = (proposal.prem_mask, 1 << proposal.conc, proposal.prem_mask, 1 << proposal.conc, 0, 0, 0, 0)
+        suff_con = [('A', proposal.prem_mask, 'R', proposal.conc)]
+    else:
+        ac = proposal.prem_mask | 1 << proposal.conc
+        masks = (ac, 0, ac, 0, 0, 0, 0, 0)
+        suff_con = [('A', proposal.prem_mask, 'A', proposal.conc)]
+    for i in proposal.prem:
+        suff_con.append(('A', proposal.prem_mask, 'A', i))
+    # Only the latest copy of a repeated sufficient condition is kept, see Stage.position_key.
+    suff_con = tuple(reversed(dict.fromkeys(reversed(suff_con))))
+    return Position(msf, cl_inferential_theory, cr_inferential_theory, proposal, 'CL', masks, 1 << proposal.conc,
+                    suff_con, frozenset([proposal]))
+
+
+def random_playout(position, rng=random) -> str:
+    """
+    Play the inquiry on from position to its end, with both agents making uniformly random moves among the available
+    ones like the 'random' policy, and give the final verdict. A playout goes through many positions that are never
+    seen again, so instead of making a Position (let alone a Stage) per move and filling the transposition table of
+    scores_after, it updates one set of scores, sufficient conditions and used moves in place.
+
+    Parameters
+    ----------
+    position : Position
+        Where the playout starts. It's left as it is.
+    rng : random.Random
+        The source of randomness, by default the random module.
+
+    Returns
+    -------
+    str
+        'sustain' or 'fail'.
+    """
+    bits = position.msf.bits
+    proposal_bit = 1 << position.proposal.conc
+    agent = position.agent
+    cl_ac, cl_rc, cl_ae, cl_re, cr_ac, cr_rc, cr_ae, cr_re = position.masks
+    controv = position.controv
+    suff_con = list(position.suff_con)
+    used_moves = set(position.used_moves)
+    while True:
+        if agent == 'CL':
+            candidates = _local_candidates(position.cr_inferential_theory, cr_ac, cr_rc, cr_ae, cl_ae, proposal_bit)
+            avail_for_move, avail_against_move = _available_among(candidates, bits, cr_ac, used_moves)
+        else:
+            candidates = _local_candidates(position.cl_inferential_theory, cl_ac, cl_rc, cl_ae, cr_ae, proposal_bit)
+            avail_for_move, avail_against_move = _available_among(candidates, bits, cl_ac, used_moves)
+        moves = avail_for_move + avail_against_move
+        if not moves:
+            break
+        move = moves[rng.randrange(len(moves))]
+
+        agent = switch_agents(agent)
+        cl_ac, cl_rc, cr_ac, cr_rc = _move_commitments(agent, move, cl_ac, cl_rc, cr_ac, cr_rc)
+        controv |= 1 << move.conc
+        suff_con += _move_suff_con(move)
+        used_moves.add(move)
+        cl_ae, cl_re, cr_ae, cr_re = compute_entitlements(cl_ac, cl_rc, cr_ac, cr_rc, controv, suff_con)
+
+    return verdict_from_masks(position.proposal, cl_ae, cl_re)
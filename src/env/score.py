@@ -1,17 +1,80 @@
 """defines scoring
 """
 
+from utils.bitmask_utils import set_to_mask, mask_to_set
+
+
 class Score:
+    """
+    A class used to represent the score of an agent: the sentences it is committed and entitled to accept and to
+    reject. The four sets are kept as bitmasks (see utils.bitmask_utils), which is what the scoring works with, and
+    given as frozensets on demand, e.g. for display.
+
+    Parameters
+    ----------
+    subject : str
+        The agent, 'CL' or 'CR'.
+    ac, rc, ae, re : frozenset
+        The indexes of the sentences the agent is committed to accept, committed to reject, entitled to accept and
+        entitled to reject. Any collection of indexes will do. See score_from_masks to make a Score from bitmasks.
+
+    Attributes
+    ----------
+    ac_mask, rc_mask, ae_mask, re_mask : int
+        The same four sets as bitmasks.
+    """
+    __slots__ = ('subject', 'ac_mask', 'rc_mask', 'ae_mask', 're_mask')
+
     def __init__(self, subject, ac, rc, ae, re):
         self.subject = subject
-        self.ac = ac    # accept committed
-        self.rc = rc    # reject committed
-        self.ae = ae    # accept entitled
-        self.re = re    # reject entitled
+        self.ac_mask = set_to_mask(ac)    # accept committed
+        self.rc_mask = set_to_mask(rc)    # reject committed
+        self.ae_mask = set_to_mask(ae)    # accept entitled
+        self.re_mask = set_to_mask(re)    # reject entitled
+
+    @property
+    def ac(self) -> frozenset:
+        return mask_to_set(self.ac_mask)
+
+    @property
+    def rc(self) -> frozenset:
+        return mask_to_set(self.rc_mask)
+
+    @property
+    def ae(self) -> frozenset:
+        return mask_to_set(self.ae_mask)
+
+    @property
+    def re(self) -> frozenset:
+        return mask_to_set(self.re_mask)
+
+
+def score_from_masks(subject, ac: int, rc: int, ae: int, re: int) -> Score:
+    """ This makes a Score straight from the bitmasks of its four sets """
+    score = Score.__new__(Score)
+    score.subject = subject
+    score.ac_mask = ac
+    score.rc_mask = rc
+    score.ae_mask = ae
+    score.re_mask = re
+    return score
 
 
 class ScoreSit:
+    """
+    A class used to represent the scores of both agents at a stage. The common ground, i.e. the sentences both are
+    committed to accept, is only computed when asked for.
+    """
+    __slots__ = ('cl', 'cr')
+
     def __init__(self, cl_score, cr_score):
         self.cl = cl_score
         self.cr = cr_score
-        self.common_ground = frozenset.intersection(self.cl.ac, self.cr.ac)
+
+    @property
+    def common_ground_mask(self) -> int:
+        return self.cl.ac_mask & self.cr.ac_mask
+
+    @property
+    def common_ground(self) -> frozenset:
+        return mask_to_set(self.common_ground_mask)
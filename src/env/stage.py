@@ -2,9 +2,92 @@
 """
 
 
-from utils.env_utils import get_prev_stages, switch_agents
-from utils.language_utils import exff_sets
-from env.score import Score, ScoreSit
+import heapq
+from bisect import bisect_right
+from itertools import chain
+from functools import cached_property
+
+from utils.env_utils import switch_agents
+from utils.bitmask_utils import set_to_mask, mask_members
+from env.score import ScoreSit, score_from_masks
+from env.suff_con import SuffCon
+from env.transpositions import transposition_table
+
+
+# The value of a verdict for CL, who wants its proposal sustained. CR wants it to fail, i.e. minimizes the value.
+VERDICT_VALUES = {'sustain': 1, 'fail': 0}
+
+
+class EpisodeHistory:
+    """
+    A class used to hold the stages of an inquiry in order, shared by all of them, so that a stage gets to the stages
+    before it, e.g. the first one with the proposal, by index instead of walking back through prev_stage. It's
+    append-only: a stage made after one that isn't the latest, e.g. to try another move, gets a history of its own,
+    which starts with a copy of the stages up to the one it's made after.
+
+    The history also indexes its stages by the agent who made them and a sentence, so that the target of a move is
+    found with a few lookups, see _infer_target.
+
+    Attributes
+    ----------
+    stages : list
+        The stages, in order of history_idx.
+    proposal_by_conc : dict
+        maps (agent, sentence) to the history_idx, in increasing order, of the stages of the agent with pragmatic
+        significance 'proposal' and that sentence as conclusion.
+    for_by_conc : dict
+        The same for the stages whose move is a reason-for.
+    against_by_conc : dict
+        The same for the stages whose move is a reason-against.
+    by_prem : dict
+        maps (agent, sentence) to the history_idx, in increasing order, of the stages of the agent whose move has that
+        sentence among its premises.
+    """
+    __slots__ = ('stages', 'proposal_by_conc', 'for_by_conc', 'against_by_conc', 'by_prem')
+
+    def __init__(self, stages=None):
+        self.stages = []
+        self.proposal_by_conc = dict()
+        self.for_by_conc = dict()
+        self.against_by_conc = dict()
+        self.by_prem = dict()
+        if stages is not None:
+            for stage in stages:
+                self.append(stage)
+
+    def __len__(self):
+        return len(self.stages)
+
+    def __getitem__(self, idx):
+        return self.stages[idx]
+
+    def append(self, stage) -> None:
+        idx = len(self.stages)
+        self.stages.append(stage)
+        move = stage.prime_move
+        if stage.prag_sig == 'proposal':
+            self.proposal_by_conc.setdefault((stage.agent, move.conc), []).append(idx)
+        if move.val == 'reason against':
+            self.against_by_conc.setdefault((stage.agent, move.conc), []).append(idx)
+        else:
+            self.for_by_conc.setdefault((stage.agent, move.conc), []).append(idx)
+        for i in move.prem:
+            self.by_prem.setdefault((stage.agent, i), []).append(idx)
+
+    def latest(self, index: dict, key: tuple, idx: int) -> int:
+        # The history_idx of the latest stage up to the one at idx under key in index, one of the dicts above, or -1.
+        # Stages after idx are only there if another stage was made after the one at idx before.
+        found = index.get(key)
+        if not found:
+            return -1
+        k = bisect_right(found, idx)
+        return found[k - 1] if k else -1
+
+    def history_after(self, stage):
+        # The history the stage made after stage is appended to.
+        if stage.history_idx == len(self.stages) - 1:
+            return self
+        return EpisodeHistory(self.stages[:stage.history_idx + 1])
 
 
 class Stage:
@@ -23,69 +106,133 @@ class Stage:
         self.prev_stage = prev_stage
         self.contro_set = contro_set
         self.suff_con = suff_con
+        # The stages of the inquiry up to this one, see EpisodeHistory. This stage is at history_idx.
+        self.history = prev_stage.history.history_after(prev_stage) if prev_stage is not None else EpisodeHistory()
+        self.history_idx = len(self.history)
+        self.history.append(self)
+        # The first move of the inquiry, whose verdict is at stake, and the verdict on it by the end of this stage, see
+        # utils.env_utils.get_verdict.
+        self.proposal = prev_stage.proposal if prev_stage is not None else prime_move
+        self.verdict = verdict_from_masks(self.proposal, f_score_sit.cl.ae_mask, f_score_sit.cl.re_mask)
+        # All moves made so far, this stage included. No move can be made twice in an inquiry.
+        if prev_stage is None:
+            self.used_moves = frozenset([prime_move])
+        else:
+            self.used_moves = prev_stage.used_moves | frozenset([prime_move])
+        # For each agent, the moves of its inferential theory that passed the tests of _passes_local_tests the last time
+        # we computed its available moves, together with the score masks they were checked against. See _get_avail_moves.
+        self.move_candidates = dict(prev_stage.move_candidates) if prev_stage is not None else dict()
         self.available_moves = self._get_avail_moves(self)
 
+    @cached_property
+    def position_key(self) -> tuple:
+        """
+        Everything the scores after the next move depend on, besides that move: the agent who moved last, the
+        commitments (cl_ac, cl_rc, cr_ac, cr_rc) and the controversial sentences as bitmasks, and the sufficient
+        conditions in order. compute_entitlements only ever uses the latest copy of a repeated sufficient condition,
+        so the earlier copies are left out. See scores_after.
+        """
+        seen = set()
+        suff_con = []
+        for i in reversed(self.suff_con):
+            if i not in seen:
+                seen.add(i)
+                suff_con.append(i)
+        suff_con.reverse()
+        return (self.agent, self.f_score_sit.cl.ac_mask, self.f_score_sit.cl.rc_mask,
+                self.f_score_sit.cr.ac_mask, self.f_score_sit.cr.rc_mask, set_to_mask(self.contro_set),
+                tuple(suff_con))
+
     def _get_avail_moves(self, stage):
         # This function is used to compute all reasons available to the next mover at a given stage.
-        avail_against_move = []
-        avail_for_move = []
-        st = get_prev_stages(stage)+[stage]
+        # All tests are done on bitmasks (see utils.bitmask_utils): the scores are turned into masks once per stage and
+        # each move is then checked with a handful of integer operations against stage.msf.bits.
+        bits = stage.msf.bits
+        proposal_bit = 1 << stage.proposal.conc
 
-        #In this case, CL made a move in this stage and we should compute available moves for CR
+        #In this case, CL made a move in this stage and we should compute available moves for CR. Otherwise, CR made a
+        # move in this stage and we should compute available moves for CL. The way it's checked is exactly the same.
         if stage.agent == 'CL':
-            # We iterate through all against-moves (i.e. reason-againsts) in the msf of the stage.
-            # Each against-move will pass a series of tests before it's added to a list.
-            for m in stage.cr_inferential_theory.against_move:
-                # Given,the move (type) under consideration is a reason-against, we first make sure that this move is
-                # targeting something that CL (i.e. the opponent of the next mover CR) is entitled to.
-                # And this move doesn't use the conclusion of the initial proposal of CL.
-                if m.conc in stage.f_score_sit.cl.ae and st[0].prime_move.conc not in m.prem:
-                    # We make sure that this move doesn't use anything that CR is committed to reject as premise and
-                    # the target of this reason-against isn't something that CR is committed to accept.
-                    if frozenset.intersection(m.prem, stage.f_score_sit.cr.rc) == frozenset() and m.conc not in stage.f_score_sit.cr.ac:
-                        # We make sure that for every premise of this move, if CR has already committed to accept it by the
-                        # end of the current stage (recall that we are computing what CR can do at next stage), CR is entitled
-                        # to it. That is, making sure that CR isn't using any premise that he's not entitled.
-                        if frozenset.intersection(m.prem, stage.f_score_sit.cr.ac).issubset(stage.f_score_sit.cr.ae):
-                            # We make sure that this the union of CR's current ac and the premises of this move isn't
-                            # persistently incoherent. In this way, CR will never make a move that will put her into
-                            # persistently incoherent ac.
-                            if not frozenset.union(stage.f_score_sit.cr.ac, m.prem) in exff_sets(stage.msf.lang, stage.msf.inc):
-                                # The last test checks that CR hasn't used this reason-against in previous stages.
-                                if all([m != i.prime_move for i in get_prev_stages(stage)] + [m != stage.prime_move]):
-                                    # Once a move (type) passes all tests above, it's added to the list of available against
-                                    # moves.
-                                    avail_against_move.append(m)
-
-            for j in stage.cr_inferential_theory.for_move: # We do the same thing for for-moves.
-                if j.conc in stage.f_score_sit.cr.ac and j.conc not in stage.f_score_sit.cr.ae and st[0].prime_move.conc not in j.prem:
-                    if frozenset.intersection(j.prem, stage.f_score_sit.cr.rc) == frozenset() and j.conc not in stage.f_score_sit.cr.rc:
-                        if frozenset.intersection(j.prem, stage.f_score_sit.cr.ac).issubset(stage.f_score_sit.cr.ae):
-                            if not frozenset.union(stage.f_score_sit.cr.ac, j.prem, frozenset([j.conc])) in exff_sets(stage.msf.lang, stage.msf.inc):
-                                if all([j != i.prime_move for i in get_prev_stages(stage)] + [j != stage.prime_move]):
-                                    avail_for_move.append(j)
-
-            return {'agent': 'CR', 'for': frozenset(avail_for_move), 'against': frozenset(avail_against_move)}
-
+            mover, theory, own, opp = 'CR', stage.cr_inferential_theory, stage.f_score_sit.cr, stage.f_score_sit.cl
+        else:
+            mover, theory, own, opp = 'CL', stage.cl_inferential_theory, stage.f_score_sit.cl, stage.f_score_sit.cr
+        masks = (own.ac_mask, own.rc_mask, own.ae_mask, opp.ae_mask)
+        own_ac = masks[0]
+
+        # Most tests only look at the scores at the conclusion and the premises of a move. So instead of checking the
+        # whole inferential theory every turn, we keep the moves that passed these tests the last time this agent was
+        # to move and only re-check the moves touching a sentence whose commitments or entitlements changed since.
+        if mover in stage.move_candidates:
+            prev_masks, prev_candidates = stage.move_candidates[mover]
+            changed = 0
+            for old, new in zip(prev_masks, masks):
+                changed |= old ^ new
+            recheck = set()
+            for i in mask_members(changed):
+                recheck.update(theory.move_by_sentence.get(i, ()))
+            candidates = [m for m in prev_candidates if m not in recheck]
+            candidates += [m for m in recheck if _passes_local_tests(m, *masks, proposal_bit)]
+        else:
+            candidates = _local_candidates(theory, *masks, proposal_bit)
+        stage.move_candidates[mover] = (masks, candidates)
+
+        avail_for_move, avail_against_move = _available_among(candidates, bits, own_ac, stage.used_moves)
+        return {'agent': mover, 'for': frozenset(avail_for_move), 'against': frozenset(avail_against_move)}
+
+
+def _local_candidates(theory, own_ac, own_rc, own_ae, opp_ae, proposal_bit):
+    # The moves of theory that pass _passes_local_tests. A move can only pass if its conclusion is one the opponent is
+    # entitled to (reasons-against) or one the mover is committed but not entitled to (reasons-for). So we only look
+    # at moves with such conclusions.
+    candidates = []
+    for i in mask_members(opp_ae):
+        candidates += [m for m in theory.against_move_by_conc.get(i, ()) if _passes_local_tests(m, own_ac, own_rc, own_ae, opp_ae, proposal_bit)]
+    for i in mask_members(own_ac & ~own_ae):
+        candidates += [m for m in theory.for_move_by_conc.get(i, ()) if _passes_local_tests(m, own_ac, own_rc, own_ae, opp_ae, proposal_bit)]
+    return candidates
+
+
+def _available_among(candidates, bits, own_ac, used_moves):
+    # The remaining tests, which give the available for-moves and against-moves among the candidates.
+    avail_against_move = []
+    avail_for_move = []
+    for m in candidates:
+        # We make sure that this the union of the mover's current ac and the premises (and for reasons-for, the
+        # conclusion) of this move isn't persistently incoherent. In this way, the mover will never make a move that
+        # will put her into persistently incoherent ac.
+        # The last test checks that the mover hasn't used this move in previous stages.
+        if m.val == 'reason against':
+            if not bits.is_exff(own_ac | m.prem_mask) and m not in used_moves:
+                avail_against_move.append(m)
         else:
-            # In this case, CR made a move in this stage and we should compute available moves for CL.
-            # The way it's checked is exactly the same as last case.
-            for m in stage.cl_inferential_theory.against_move:
-                if m.conc in stage.f_score_sit.cr.ae and st[0].prime_move.conc not in m.prem:
-                    if frozenset.intersection(m.prem, stage.f_score_sit.cl.rc) == frozenset() and m.conc not in stage.f_score_sit.cl.ac:
-                        if frozenset.intersection(m.prem, stage.f_score_sit.cl.ac).issubset(stage.f_score_sit.cl.ae):
-                            if not frozenset.union(stage.f_score_sit.cl.ac, m.prem) in exff_sets(stage.msf.lang, stage.msf.inc):
-                                if all([m != i.prime_move for i in get_prev_stages(stage)] + [m != stage.prime_move]):
-                                    avail_against_move.append(m)
-
-            for j in stage.cl_inferential_theory.for_move:
-                if j.conc in stage.f_score_sit.cl.ac and j.conc not in stage.f_score_sit.cl.ae and st[0].prime_move.conc not in j.prem:
-                    if frozenset.intersection(j.prem, stage.f_score_sit.cl.rc) == frozenset() and j.conc not in stage.f_score_sit.cl.rc:
-                        if frozenset.intersection(j.prem, stage.f_score_sit.cl.ac).issubset(stage.f_score_sit.cl.ae):
-                            if not frozenset.union(stage.f_score_sit.cl.ac, j.prem, frozenset([j.conc])) in exff_sets(stage.msf.lang, stage.msf.inc):
-                                if all([j != i.prime_move for i in get_prev_stages(stage)] + [j != stage.prime_move]):
-                                    avail_for_move.append(j)
-            return {'agent': 'CL','for': frozenset(avail_for_move), 'against': frozenset(avail_against_move)}
+            if not bits.is_exff(own_ac | m.prem_mask | 1 << m.conc) and m not in used_moves:
+                avail_for_move.append(m)
+    return avail_for_move, avail_against_move
+
+
+def _passes_local_tests(m, own_ac, own_rc, own_ae, opp_ae, proposal_bit):
+    # The tests of a move that only depend on the scores at its conclusion and premises. own_* are the score masks of
+    # the next mover, opp_ae the accept entitlements of its opponent.
+    conc_bit = 1 << m.conc
+    if m.val == 'reason against':
+        # Given,the move (type) under consideration is a reason-against, we first make sure that this move is
+        # targeting something that the opponent of the next mover is entitled to.
+        # And this move doesn't use the conclusion of the initial proposal of CL.
+        if opp_ae & conc_bit and not m.prem_mask & proposal_bit:
+            # We make sure that this move doesn't use anything that the mover is committed to reject as premise and
+            # the target of this reason-against isn't something that the mover is committed to accept.
+            if not m.prem_mask & own_rc and not own_ac & conc_bit:
+                # We make sure that for every premise of this move, if the mover has already committed to accept it
+                # by the end of the current stage, the mover is entitled to it. That is, making sure that the mover
+                # isn't using any premise that he's not entitled.
+                return not m.prem_mask & own_ac & ~own_ae
+    else:
+        # We do the same thing for for-moves, whose conclusion must be something the mover is committed to accept but
+        # not yet entitled to.
+        if own_ac & conc_bit and not own_ae & conc_bit and not m.prem_mask & proposal_bit:
+            if not m.prem_mask & own_rc and not own_rc & conc_bit:
+                return not m.prem_mask & own_ac & ~own_ae
+    return False
 
 
 def initial_next_stage(prev_stage, target_stage, prag_sig, move):
@@ -125,167 +272,239 @@ def initial_next_stage(prev_stage, target_stage, prag_sig, move):
 
     frame = prev_stage.msf
     a = switch_agents(prev_stage.agent)
-    if move.val == 'reason against': # For the case where the valence of next move is reason-against.
-        # To simplify the scoring process, I keep a list of controversial sentences.
-        # This step updates the set of controversial claims.
-        controv = frozenset.union(prev_stage.contro_set, frozenset([move.conc]))
-        # The next four lines update the sufficient conditions for scoring.
-        scon = []
-        for i in move.prem:
-            scon.append(('A', None, 'A', i))
-        suff_con = prev_stage.suff_con + [('A', move.prem, 'R', move.conc)] + scon
+    # To simplify the scoring process, I keep a list of controversial sentences.
+    # This step updates the set of controversial claims.
+    controv = frozenset.union(prev_stage.contro_set, frozenset([move.conc]))
+    # Sufficient conditions are tuples ('A', premises, 'A' or 'R', conclusion), where premises is either None or a
+    # bitmask of sentences, see utils.bitmask_utils. The new ones are appended to those of prev_stage without copying
+    # them, see env.suff_con.SuffCon.
+    suff_con = prev_stage.suff_con + _move_suff_con(move)
+
+    # The commitments and entitlements after the move, as bitmasks. They only depend on the position and the move, so
+    # they may well have been computed already, e.g. when a policy looked ahead.
+    cl_ac, cl_rc, cl_ae, cl_re, cr_ac, cr_rc, cr_ae, cr_re = scores_after(prev_stage, move)
+
+    # Creating scores for CL and CR.
+    cl = score_from_masks('CL', ac = cl_ac, ae = cl_ae, rc = cl_rc, re = cl_re)
+    cr = score_from_masks('CR', ac = cr_ac, ae = cr_ae, rc = cr_rc, re = cr_re)
+
+    # Creating final score
+    finalscore = ScoreSit(cl_score = cl, cr_score = cr)
+
+    next_stage = Stage(msf = frame, turn_idx = prev_stage.turn_idx + 1, agent = a, cl_inferential_theory = prev_stage.cl_inferential_theory,
+                 cr_inferential_theory = prev_stage.cr_inferential_theory, a_score_sit = prev_stage.f_score_sit,
+                 target_move = target_stage, prag_sig = prag_sig, prime_move=move, f_score_sit = finalscore,
+                 prev_stage=prev_stage, contro_set = controv, suff_con = suff_con)
 
+    return next_stage
+
+
+def _move_suff_con(move):
+    # The sufficient conditions a move adds to those of the earlier moves. A reason-for or reason-against makes its
+    # premises sufficient for its conclusion, or for rejecting it, and every premise is sufficient for itself.
+    if move.val == 'reason against': # For the case where the valence of next move is reason-against.
+        suff_con = [('A', move.prem_mask, 'R', move.conc)]
     else:   # This is for the case where the valence of next move is reason-for.
-        controv = frozenset.union(prev_stage.contro_set, frozenset([move.conc]))
-        scon = []
-        for i in move.prem:
-            scon.append(('A', None, 'A', i))
-        suff_con = prev_stage.suff_con + [('A', move.prem, 'A', move.conc)] + scon
+        suff_con = [('A', move.prem_mask, 'A', move.conc)]
+    for i in move.prem:
+        suff_con.append(('A', None, 'A', i))
+    return suff_con
 
-    # The following block updates the commitments of CL and CR in different cases.
-    # Updating commitments is a very simple process that has nothing to do with entitlements.
-    if a == 'CL':
+
+def _move_commitments(agent, move, cl_ac, cl_rc, cr_ac, cr_rc):
+    # This updates the commitments of CL and CR when agent makes move. Updating commitments is a very simple process
+    # that has nothing to do with entitlements.
+    conc_bit = 1 << move.conc
+    if agent == 'CL':
         if move.val == 'reason against':
-            cl_ac = frozenset.union(prev_stage.f_score_sit.cl.ac, move.prem)
-            cl_rc = frozenset.union(prev_stage.f_score_sit.cl.rc, frozenset([move.conc]))
+            cl_ac = cl_ac | move.prem_mask
+            cl_rc = cl_rc | conc_bit
         else:
-            cl_ac = frozenset.union(prev_stage.f_score_sit.cl.ac, move.prem, frozenset([move.conc]))
-            cl_rc = prev_stage.f_score_sit.cl.rc
-        cr_ac = prev_stage.f_score_sit.cr.ac
-        cr_rc = prev_stage.f_score_sit.cr.rc
+            cl_ac = cl_ac | move.prem_mask | conc_bit
     else:
         if move.val == 'reason against':
-            cr_ac = frozenset.union(prev_stage.f_score_sit.cr.ac, move.prem)
-            cr_rc = frozenset.union(prev_stage.f_score_sit.cr.rc, frozenset([move.conc]))
+            cr_ac = cr_ac | move.prem_mask
+            cr_rc = cr_rc | conc_bit
         else:
-            cr_ac = frozenset.union(prev_stage.f_score_sit.cr.ac, move.prem, frozenset([move.conc]))
-            cr_rc = prev_stage.f_score_sit.cr.rc
-        cl_ac = prev_stage.f_score_sit.cl.ac
-        cl_rc = prev_stage.f_score_sit.cl.rc
-
-        #Now we are done with commitments, sufficient conditions and controversial statements. Time for entitlements!
-
-    # We first initiate lists of potential entitlements of CL and CR. E.g. p_cl_ae intended to be the set of sentences that
-    # the CL is potentially entitled to accept. It starts as the set of sentences CL is committed to accept.
-    p_cl_ae = cl_ac
-    p_cl_re = cl_rc
-    p_cr_ae = cr_ac
-    p_cr_re = cr_rc
-    cl_ae = []
-    cl_re = []
-    cr_ae = []
-    cr_re = []
+            cr_ac = cr_ac | move.prem_mask | conc_bit
+    return cl_ac, cl_rc, cr_ac, cr_rc
 
-    # First Step: make agents entitled to accept all noncontroversial sentences that they are committed to accept.
-    # A sentence is not controversial if it has never appeared on the right of a turntile. This is just to simplify
-    # the process of keeping track of entitlement. The tracking process still works without it, albeit slower.
-    for i in cl_ac:
-        if i not in controv:
-            cl_ae.append(i)
-    for i in cr_ac:
-        if i not in controv:
-            cr_ae.append(i)
-
-    # Second Step: Iterate through all sufficient conditions accumulated so far from the latest to earliest.
-    # Basically, we iterate until we find a sufficient condition, whose premises are met and conclusion has yet been
-    # actualized. We then actualize it and redo the interation from the beginning. We do so until there is no further
-    # sufficient condition to be actualized, i.e. for each suff_con, either its premises are not met, or its conclusion
-    # has already been actualized.
-    n = 0
-    while n < len(suff_con):
-        n = 0
-        for i in reversed(suff_con):
-            if i[2] == 'A':  # The case of A -> A condition
-                if i[1] is None:  # The case of automatic satisfication
-                    if i[3] in p_cl_ae and i[3] not in cl_ae:  # Case of CL
-                        cl_ae.append(i[3])
-                        p_cr_re = p_cr_re - frozenset([i[3]])
-                        break
-                    if i[3] in p_cr_ae and i[3] not in cr_ae:  # Case of CR
-                        cr_ae.append(i[3])
-                        p_cl_re = p_cl_re - frozenset([i[3]])
-                        break
-                elif i[1] is not None:  # The case of conditional satisfication
-                    if i[1].issubset(frozenset(cl_ae)) and i[3] in p_cl_ae and i[3] not in cl_ae:  # Case of CL
-                        cl_ae.append(i[3])
-                        p_cr_re = p_cr_re - frozenset([i[3]])
-                        break
-                    if i[1].issubset(frozenset(cr_ae)) and i[3] in p_cr_ae and i[3] not in cr_ae:  # Case of CR
-                        cr_ae.append(i[3])
-                        p_cl_re = p_cl_re - frozenset([i[3]])
-                        break
-            elif i[2] == 'R':  # The case of A -> R condition
-                if i[1].issubset(frozenset(cl_ae)) and i[3] in p_cl_re and i[3] not in cl_re:
-                    cl_re.append(i[3])
-                    p_cr_ae = p_cr_ae - frozenset([i[3]])
-                    break
-                if i[1].issubset(frozenset(cr_ae)) and i[3] in p_cr_re and i[3] not in cr_re:
-                    cr_re.append(i[3])
-                    p_cl_ae = p_cl_ae - frozenset([i[3]])
-                    break
-            n = n + 1
-
-    # We initiated cl_ae, cl_re, cr_ae, cr_re as lists for convenience. Now we convert them back to frozensets.
-    cl_ae = frozenset(cl_ae)
-    cl_re = frozenset(cl_re)
-    cr_ae = frozenset(cr_ae)
-    cr_re = frozenset(cr_re)
 
-    # Creating scores for CL and CR.
-    cl = Score('CL', ac = cl_ac, ae = cl_ae, rc = cl_rc, re = cl_re)
-    cr = Score('CR', ac = cr_ac, ae = cr_ae, rc = cr_rc, re = cr_re)
+def scores_after(stage, move):
+    """
+    Compute the scores after move is made at stage, without making the next stage. Scores only depend on the
+    position, see Stage.position_key, and the move, so they are looked up in, and added to, the transposition table
+    of the MSF, which is shared by all turns and episodes over it.
 
-    # Creating final score
-    finalscore = ScoreSit(cl_score = cl, cr_score = cr)
+    Parameters
+    ----------
+    stage : Stage
+        The stage at which the move is made, or a Position, see env.game_tree.
+    move : MoveType
+        The move, made by the agent to move after stage.
 
-    next_stage = Stage(msf = frame, turn_idx = prev_stage.turn_idx + 1, agent = a, cl_inferential_theory = prev_stage.cl_inferential_theory,
-                 cr_inferential_theory = prev_stage.cr_inferential_theory, a_score_sit = prev_stage.f_score_sit,
-                 target_move = target_stage, prag_sig = prag_sig, prime_move=move, f_score_sit = finalscore,
-                 prev_stage=prev_stage, contro_set = controv, suff_con = suff_con)
+    Returns
+    -------
+    tuple
+        (cl_ac, cl_rc, cl_ae, cl_re, cr_ac, cr_rc, cr_ae, cr_re) as bitmasks.
+    """
+    key = (stage.position_key, move.key)
+    table = transposition_table(stage.msf, 'scores')
+    masks = table.get(key)
+    if masks is None:
+        agent, cl_ac, cl_rc, cr_ac, cr_rc, controv, suff_con = stage.position_key
+        cl_ac, cl_rc, cr_ac, cr_rc = _move_commitments(switch_agents(agent), move, cl_ac, cl_rc, cr_ac, cr_rc)
+        cl_ae, cl_re, cr_ae, cr_re = compute_entitlements(cl_ac, cl_rc, cr_ac, cr_rc, controv | 1 << move.conc,
+                                                          suff_con, _move_suff_con(move))
+        masks = (cl_ac, cl_rc, cl_ae, cl_re, cr_ac, cr_rc, cr_ae, cr_re)
+        table.put(key, masks)
+    return masks
+
+
+def verdict_from_masks(proposal, ae_mask: int, re_mask: int) -> str:
+    """
+    The verdict on proposal given the masks of the sentences CL is entitled to accept and to reject: it's sustained iff
+    CL is entitled to reject its conclusion, for a reason against, or to accept it, for a reason for.
+    """
+    if proposal.val == 'reason against':
+        entitled = re_mask >> proposal.conc & 1
+    else:
+        entitled = ae_mask >> proposal.conc & 1
+    return 'sustain' if entitled else 'fail'
+
+
+def verdict_after(stage, move):
+    """
+    The verdict on the proposal after move is made at stage, i.e. the verdict of the stage that move would lead to,
+    derived from the scores after move alone, without making that stage. See scores_after.
+    """
+    masks = scores_after(stage, move)
+    return verdict_from_masks(stage.proposal, masks[2], masks[3])
 
-    return next_stage
+
+def compute_entitlements(cl_ac, cl_rc, cr_ac, cr_rc, controv, suff_con, extra=()):
+    """
+    Compute the entitlements of CL and CR from their commitments and the sufficient conditions accumulated so far.
+    All sets of sentences, in and out, are bitmasks (see utils.bitmask_utils).
+
+    The semantics is that of a priority scan: iterate through all sufficient conditions from the latest to earliest,
+    find the first one whose premises are met and conclusion has yet been actualized (for CL first, then for CR),
+    actualize it and redo the iteration from the beginning, until no sufficient condition can be actualized.
+    Rescanning like that is quadratic in the number of sufficient conditions, so instead we forward chain like for
+    Horn clauses: each condition keeps, for each agent, a count of its premises the agent isn't yet entitled to, and a
+    condition enters a heap, ordered by the priority of the scan, once its count drops to zero. Whether a condition
+    can be actualized only changes one way once its premises are met (the potential entitlements only shrink and
+    actual ones only grow), so a condition popped from the heap that can't be actualized is dropped for good and
+    the heap always yields what the scan would have actualized next.
+
+    Parameters
+    ----------
+    cl_ac, cl_rc, cr_ac, cr_rc : int
+        The commitments of CL and CR.
+    controv : int
+        The controversial sentences, i.e. those that have appeared on the right of a turnstile.
+    suff_con : list
+        The sufficient conditions, each a tuple ('A', premises, 'A' or 'R', conclusion), where premises is either None
+        or a bitmask, in the order they were accumulated. A SuffCon (see env.suff_con) or a tuple will do as well.
+    extra : list
+        Sufficient conditions that come after those of suff_con, e.g. those of a move being looked ahead at. They are
+        read where they are, so that suff_con doesn't have to be copied to append them.
+
+    Returns
+    -------
+    tuple
+        (cl_ae, cl_re, cr_ae, cr_re) as bitmasks.
+    """
+    # Lists indexed by agent, 0 for CL and 1 for CR. We first initiate potential entitlements of CL and CR. E.g.
+    # p_ae[0] is intended to be the set of sentences that the CL is potentially entitled to accept. It starts as the set
+    # of sentences CL is committed to accept.
+    p_ae = [cl_ac, cr_ac]
+    p_re = [cl_rc, cr_rc]
+
+    # First Step: make agents entitled to accept all noncontroversial sentences that they are committed to accept.
+    # A sentence is not controversial if it has never appeared on the right of a turntile. This is just to simplify
+    # the process of keeping track of entitlement. The tracking process still works without it, albeit slower.
+    ae = [cl_ac & ~controv, cr_ac & ~controv]
+    re = [0, 0]
+
+    # Second Step: count the unmet premises of every condition for each agent and put the conditions whose premises
+    # are met on the heap. Entries are (-index, agent), so that later conditions come first and CL comes before CR.
+    # Conditions are indexed through suff_con and then extra. A SuffCon is read through its shared list directly.
+    base = suff_con.conditions if isinstance(suff_con, SuffCon) else suff_con
+    n_base = len(suff_con)
+    n = n_base + len(extra)
+    unmet = [[0] * n, [0] * n]
+    waiting = [dict(), dict()]  # For each agent, maps a sentence to the conditions waiting for it as a premise.
+    heap = []
+    for k, i in enumerate(chain(suff_con, extra)):
+        for agent in (0, 1):
+            missing = i[1] & ~ae[agent] if i[1] is not None else 0
+            if missing:
+                members = mask_members(missing)
+                unmet[agent][k] = len(members)
+                for p in members:
+                    waiting[agent].setdefault(p, []).append(k)
+            else:
+                heap.append((-k, agent))
+    heapq.heapify(heap)
+
+    # Third Step: actualize conditions in order of priority until the heap runs out.
+    while heap:
+        k, agent = heapq.heappop(heap)
+        i = base[-k] if -k < n_base else extra[-k - n_base]
+        bit = 1 << i[3]
+        other = 1 - agent
+        if i[2] == 'A':  # The case of A -> A condition
+            if p_ae[agent] & bit and not ae[agent] & bit:
+                ae[agent] |= bit
+                p_re[other] &= ~bit
+                for j in waiting[agent].pop(i[3], ()):
+                    unmet[agent][j] -= 1
+                    if unmet[agent][j] == 0:
+                        heapq.heappush(heap, (-j, agent))
+        elif i[2] == 'R':  # The case of A -> R condition
+            if p_re[agent] & bit and not re[agent] & bit:
+                re[agent] |= bit
+                p_ae[other] &= ~bit
+
+    return ae[0], re[0], ae[1], re[1]
+
+
+def _infer_target(stage, prime):
+    # The target stage and pragmatic significance of prime, made after stage. Going back from stage, the first stage
+    # that fits decides:
+    # a reason-for is a proposal if the mover has proposed its conclusion, and a conclusion challenge of the opponent's
+    # reason-against with the same conclusion;
+    # a reason-against is a proposal likewise, a premise challenge of the opponent's move with its conclusion among
+    # the premises, and a conclusion challenge of the opponent's reason-for with the same conclusion.
+    # Instead of going back through the stages, we look up the latest fitting stage of each kind in the indexes of the
+    # history, see EpisodeHistory.latest. -1 stands for none.
+    history, idx = stage.history, stage.history_idx
+    mover, opponent = switch_agents(stage.agent), stage.agent
+    proposal = history.latest(history.proposal_by_conc, (mover, prime.conc), idx)
+    if prime.val == 'reason for':
+        conclusion = history.latest(history.against_by_conc, (opponent, prime.conc), idx)
+        premise = -1
+    else:
+        conclusion = history.latest(history.for_by_conc, (opponent, prime.conc), idx)
+        premise = history.latest(history.by_prem, (opponent, prime.conc), idx)
+
+    latest = max(proposal, premise, conclusion)
+    if latest == -1:
+        return None, None
+    elif latest == proposal:
+        return None, 'proposal'
+    elif latest == premise:
+        # A premise challenge comes before a conclusion challenge of the same stage.
+        return history[premise], 'premise challenge'
+    else:
+        return history[conclusion], 'conclusion challenge'
 
 
 def initial_next_stage_2(stage, prime):
     # This is the second part of initial_next_stage. Most parameters required by initial_next_stage can be inferred from the
     # move to be take. Thus this function does the inferring and reduces the number of parameters required by initial_next_stage.
-    if prime.val == 'reason for':
-        for i in reversed(get_prev_stages(stage)+[stage]):
-            if i.prag_sig == 'proposal' and i.prime_move.conc == prime.conc and i.agent != stage.agent:
-                target_stage = None
-                prag_sig = 'proposal'
-                break
-            elif i.prime_move.val == 'reason against' and i.prime_move.conc == prime.conc and i.agent == stage.agent:
-                target_stage = i
-                prag_sig = 'conclusion challenge'
-                break
-            else:
-                target_stage = None
-                prag_sig = None
-    elif prime.val == 'reason against':
-        for i in reversed(get_prev_stages(stage) + [stage]):
-            if i.prag_sig == 'proposal' and i.prime_move.conc == prime.conc and i.agent != stage.agent:
-                target_stage = None
-                prag_sig = 'proposal'
-                break
-            elif i.prime_move.val == 'reason against' and i.agent == stage.agent:
-                if prime.conc in i.prime_move.prem:
-                    target_stage = i
-                    prag_sig = 'premise challenge'
-                    break
-            elif i.prime_move.val == 'reason for' and i.agent == stage.agent:
-                if prime.conc in i.prime_move.prem:
-                    target_stage = i
-                    prag_sig = 'premise challenge'
-                    break
-                elif prime.conc == i.prime_move.conc:
-                    target_stage = i
-                    prag_sig = 'conclusion challenge'
-                    break
-            else:
-                target_stage = None
-                prag_sig = None
-
+    target_stage, prag_sig = _infer_target(stage, prime)
     return initial_next_stage(prev_stage = stage, target_stage = target_stage, prag_sig = prag_sig, move = prime)
 
 
@@ -318,17 +537,10 @@ def manual_next_stage(prev_stage, target_stage, prag_sig, proposal, val):
         The next stage in which the move specified in the input is made.
     '''
     agent = switch_agents(prev_stage.agent)
-    prime = None
     if val == 'reason against':
-        for m in prev_stage.msf.against_move:
-            if m.prem == proposal[0] and m.conc == proposal[1] and m.val == 'reason against':
-                prime = m
-                break
+        prime = prev_stage.msf.get_move(proposal[0], 'reason against', proposal[1])
     else:
-        for m in prev_stage.msf.for_move:
-            if m.prem == proposal[0] and m.conc == proposal[1] and m.val == 'reason for':
-                prime = m
-                break
+        prime = prev_stage.msf.get_move(proposal[0], 'reason for', proposal[1])
     if prime is None:
         print('The proposed next move is not in the given MSF.')
     elif agent == 'CL' and prime not in prev_stage.cl_inferential_theory.for_move and prime not in prev_stage.cl_inferential_theory.against_move:
@@ -348,17 +560,10 @@ def manual_next_stage_2(prev_stage, target_stage, prag_sig, premise, val, conclu
 
 def manual_next_stage_infer(prev_stage, proposal, val):
     agent = switch_agents(prev_stage.agent)
-    prime = None
     if val == 'reason against':
-        for m in prev_stage.msf.against_move:
-            if m.prem == proposal[0] and m.conc == proposal[1] and m.val == 'reason against':
-                prime = m
-                break
+        prime = prev_stage.msf.get_move(proposal[0], 'reason against', proposal[1])
     else:
-        for m in prev_stage.msf.for_move:
-            if m.prem == proposal[0] and m.conc == proposal[1] and m.val == 'reason for':
-                prime = m
-                break
+        prime = prev_stage.msf.get_move(proposal[0], 'reason for', proposal[1])
     if prime is None:
         print('The proposed next move is not in the given MSF.')
     elif agent == 'CL' and prime not in prev_stage.cl_inferential_theory.for_move and prime not in prev_stage.cl_inferential_theory.against_move:
@@ -0,0 +1,65 @@
+""" defines a persistent sequence of sufficient conditions, shared by the stages of an inquiry
+"""
+
+
+class SuffCon:
+    """
+    A class used to represent the sufficient conditions of a stage, i.e. tuples ('A', premises, 'A' or 'R',
+    conclusion), in the order they were accumulated. It's a view of the first length conditions of a list shared with
+    the other stages of the inquiry: appending the conditions of the next move extends the shared list in place,
+    unless some other sequence was appended to this one before, e.g. to try another move, in which case the
+    conditions are copied into a list of their own. So every stage of an inquiry adds only its own conditions, instead
+    of a copy of all of them.
+
+    A SuffCon never changes. It's indexed and iterated, also in reverse, like a list.
+
+    Parameters
+    ----------
+    conditions : list
+        The sufficient conditions. The list is taken over, not copied.
+    length : int
+        The number of conditions of the list that belong to this sequence, by default all of them.
+    """
+    __slots__ = ('conditions', 'length')
+
+    def __init__(self, conditions=None, length=None):
+        self.conditions = conditions if conditions is not None else []
+        self.length = length if length is not None else len(self.conditions)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return self.conditions[:self.length][k]
+        if k < 0:
+            k += self.length
+        if not 0 <= k < self.length:
+            raise IndexError('SuffCon index out of range')
+        return self.conditions[k]
+
+    def __iter__(self):
+        conditions = self.conditions
+        for k in range(self.length):
+            yield conditions[k]
+
+    def __reversed__(self):
+        conditions = self.conditions
+        for k in range(self.length - 1, -1, -1):
+            yield conditions[k]
+
+    def __add__(self, other):
+        # The sequence with the conditions of other appended, sharing this one's list if nothing else was appended to
+        # it yet.
+        if self.length == len(self.conditions):
+            conditions = self.conditions
+        else:
+            conditions = self.conditions[:self.length]
+        conditions.extend(other)
+        return SuffCon(conditions, len(conditions))
+
+    def __eq__(self, other):
+        return len(self) == len(other) and all(i == j for i, j in zip(self, other))
+
+    def __repr__(self):
+        return 'SuffCon(' + repr(self.conditions[:self.length]) + ')'
@@ -0,0 +1,71 @@
+""" defines transposition tables, which remember what happens after a move from a position already seen
+"""
+
+import weakref
+from collections import OrderedDict
+
+
+# The number of entries a TranspositionTable keeps at most.
+TRANSPOSITION_TABLE_SIZE = 200000
+
+
+class TranspositionTable:
+    """
+    A class used to remember results computed for a position of an inquiry, e.g. the scores after a move, so that
+    they are computed once however often the same position comes up, in the same episode or another one over the
+    same MSF. Keys must determine the result: see Stage.position_key.
+
+    Parameters
+    ----------
+    max_size : int
+        The number of entries kept. When the table is full, a new entry replaces the least recently used one, so that
+        e.g. the entries a deepening search keeps coming back to survive while those of abandoned lines go first.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups that found an entry.
+    misses : int
+        The number of lookups that didn't.
+    """
+    def __init__(self, max_size: int = TRANSPOSITION_TABLE_SIZE):
+        self.max_size = max_size
+        # Entries in order of use, the least recently used first.
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # Returns None if there is no entry for key.
+        value = self.table.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.table.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        if key in self.table:
+            self.table.move_to_end(key)
+        elif len(self.table) >= self.max_size:
+            self.table.popitem(last=False)
+        self.table[key] = value
+
+    def __len__(self):
+        return len(self.table)
+
+
+# One table per MSF and kind of result, dropped together with the MSF.
+_tables = weakref.WeakKeyDictionary()
+
+
+def transposition_table(msf, kind: str) -> TranspositionTable:
+    """ This gives the TranspositionTable of the given kind (e.g. 'scores') shared by everything played over msf """
+    tables = _tables.get(msf)
+    if tables is None:
+        tables = dict()
+        _tables[msf] = tables
+    if kind not in tables:
+        tables[kind] = TranspositionTable()
+    return tables[kind]
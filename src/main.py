@@ -17,15 +17,61 @@ E.g. ['a_0', 'a_1', 'a_2'] would be an enumerated language with 3 sentences. So
 
 """
 
+import argparse
 import ast
+import json
+import sys
 from env.user_interface import UserInterface
+from env.episode_runners import run_episode_batch
+from env.episode_records import open_episode_sink
 
 import pdb
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run Dialogic Pragmatics inquiries. By default, a single inquiry is run and displayed.')
+    parser.add_argument('--n_sentences', type=int, default=7, help='number of sentences of the enumerated language')
+    parser.add_argument('--n_episodes', type=int, default=None,
+                        help='run this many inquiries in parallel and print one JSON line per finished inquiry')
+    parser.add_argument('--output', default=None,
+                        help='with --n_episodes, stream the inquiry records to this .jsonl or .parquet file instead of printing them')
+    parser.add_argument('--n_workers', type=int, default=None, help='number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the batch, each inquiry gets its own seed derived from it')
+    parser.add_argument('--cl_policy_name', default='one_step_ahead')
+    parser.add_argument('--cr_policy_name', default='minimize_ac')
+    parser.add_argument('--cl_policy_kwargs', type=ast.literal_eval, default=None,
+                        help='parameters of CL\'s policy as a Python dict, e.g. "{\'max_depth\': 6, \'time_budget\': 0.5}" for minimax or "{\'n_simulations\': 500}" for mcts')
+    parser.add_argument('--cr_policy_kwargs', type=ast.literal_eval, default=None,
+                        help='parameters of CR\'s policy as a Python dict')
+    parser.add_argument('--cl_inferential_theory_name', default='random')
+    parser.add_argument('--cr_inferential_theory_name', default='random')
+    parser.add_argument('--target', default='random')
+    parser.add_argument('--goal', default='argue_for')
+    return parser.parse_args()
+
+
 def main():
-    lang = ['a_0', 'a_1', 'a_2', 'a_3', 'a_4', 'a_5', 'a_6']
-    UserInterface(lang)
+    args = parse_args()
+    lang = ['a_' + str(i) for i in range(args.n_sentences)]
+
+    if args.n_episodes is None:
+        UserInterface(lang)
+    else:
+        args.lang = lang
+        args.proposal = 'undeclared'
+        results = run_episode_batch(args, n_episodes=args.n_episodes, seed=args.seed, n_workers=args.n_workers)
+        n_errors = 0
+        if args.output is None:
+            for record in results:
+                n_errors += 'error' in record
+                print(json.dumps(record), flush=True)
+        else:
+            with open_episode_sink(args.output) as sink:
+                for record in results:
+                    n_errors += 'error' in record
+                    sink.write(record)
+        if n_errors:
+            print(f'Warning: {n_errors} of {args.n_episodes} inquiries failed, see the records with an error.', file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+"""bitmask helpers for subsets of an enumerated language
+
+A subset of the (indexes of the) enumerated language is represented as an integer whose i-th bit is set iff the
+sentence indexed by i is in the subset. E.g. frozenset([0, 2]) is the mask 0b101 == 5.
+A family of subsets (e.g. inc) is represented as an integer bitset over all 2^n masks: the bit at position m is set
+iff the subset with mask m is in the family.
+"""
+
+import numpy as np
+
+
+def set_to_mask(s) -> int:
+    """ This gives the mask of a collection of indexes of sentences """
+    mask = 0
+    for i in s:
+        mask |= 1 << i
+    return mask
+
+
+def mask_to_set(mask: int) -> frozenset:
+    """ This gives the frozenset of indexes of sentences in a mask """
+    return frozenset(mask_members(mask))
+
+
+def mask_members(mask: int) -> list:
+    """ This gives the list of indexes of sentences in a mask, in increasing order """
+    # Reading the binary string backwards is linear in the bit length, which matters for bitsets over 2^n masks.
+    return [i for i, b in enumerate(bin(mask)[:1:-1]) if b == '1']
+
+
+def mask_size(mask: int) -> int:
+    """ This gives the number of sentences in a mask """
+    return bin(mask).count('1')
+
+
+def full_mask(n: int) -> int:
+    """ This gives the mask of the entire language of n sentences """
+    return (1 << n) - 1
+
+
+def family_to_bitset(family) -> int:
+    """ This gives the bitset of a collection of masks """
+    bitset = 0
+    for m in family:
+        bitset |= 1 << m
+    return bitset
+
+
+def bitset_members(bitset: int) -> list:
+    """ This gives the list of masks in a bitset, in increasing order """
+    return mask_members(bitset)
+
+
+def masks_containing(bit: int, n: int) -> int:
+    """ This gives the bitset of all masks of a language of n sentences that contain the sentence indexed by bit """
+    # Masks containing bit come in runs of length 2^bit, one run every 2^(bit+1) masks. Multiplying the run by
+    # 1 + 2^period + 2^(2*period) + ... repeats it over all 2^n masks.
+    period = 1 << (bit + 1)
+    run = ((1 << (1 << bit)) - 1) << (1 << bit)
+    repeat = ((1 << (1 << n)) - 1) // ((1 << period) - 1)
+    return run * repeat
+
+
+def bitset_to_array(bitset: int, size: int) -> np.ndarray:
+    """ This gives a boolean array of the given size, whose entry at m is True iff bit m of the bitset is set """
+    data = np.frombuffer(bitset.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(data, bitorder='little')[:size].astype(bool)
+
+
+def array_to_bitset(array: np.ndarray) -> int:
+    """ This gives the bitset whose bit m is set iff the entry at m of a boolean array is True """
+    return int.from_bytes(np.packbits(np.asarray(array, dtype=bool), bitorder='little').tobytes(), 'little')
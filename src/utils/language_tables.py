@@ -0,0 +1,101 @@
+""" defines a process-wide cache of the tables that only depend on the length of an enumerated language
+"""
+
+from functools import lru_cache, cached_property
+
+import numpy as np
+
+from utils.utils import list_powerset_
+
+
+# The number of language lengths whose tables are kept. Tables for a language of n sentences take O(n * 2^n) space.
+LANGUAGE_TABLES_CACHE_SIZE = 8
+
+
+class LanguageTables:
+    """
+    A class used to hold the tables that only depend on the length of an enumerated language, e.g. all possible
+    implications. Each table is computed once, the first time it's used, and shared by everyone asking for the same
+    length through language_tables. Tables are immutable: frozensets and read-only numpy arrays.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+
+    Attributes
+    ----------
+    n : int
+        The length of the enumerated language.
+    subsets : tuple
+        The frozenset of indexes of sentences for every mask, i.e. subsets[m] == mask_to_set(m).
+    powerset_ : frozenset
+        All non-empty subsets of the (indexes of the) language, i.e. list_powerset_ of the language.
+    possible_imp : frozenset
+        All possible implications, see possible_imp_generator.
+    co : frozenset
+        All implications required by CO, see co_generator.
+    possible_non_co_imp : frozenset
+        All possible implications not required by CO, see possible_non_co_imp_generator.
+    possible_inc : frozenset
+        All possible incoherent sets, see possible_inc_generator.
+    mask_sizes : np.ndarray
+        An array of length 2^n, whose entry at mask m is the number of sentences in m.
+    contains : np.ndarray
+        A boolean array of shape (n, 2^n), whose entry at (c, m) is True iff the sentence c is in mask m.
+    """
+    def __init__(self, n):
+        self.n = n
+
+    @cached_property
+    def subsets(self) -> tuple:
+        return tuple(frozenset(i for i in range(self.n) if m >> i & 1) for m in range(1 << self.n))
+
+    @cached_property
+    def powerset_(self) -> frozenset:
+        return list_powerset_([i for i in range(self.n)])
+
+    @cached_property
+    def possible_imp(self) -> frozenset:
+        result = []
+        for i in self.powerset_:
+            for j in range(self.n):
+                result.append((i, j))
+        return frozenset(result)
+
+    @cached_property
+    def co(self) -> frozenset:
+        result = []
+        for i in self.powerset_:
+            for j in i:
+                result.append((i, j))
+        return frozenset(result)
+
+    @cached_property
+    def possible_non_co_imp(self) -> frozenset:
+        return self.possible_imp - self.co
+
+    @cached_property
+    def possible_inc(self) -> frozenset:
+        return self.powerset_ - frozenset([frozenset([i]) for i in range(self.n)])
+
+    @cached_property
+    def mask_sizes(self) -> np.ndarray:
+        masks = np.arange(1 << self.n)
+        sizes = np.zeros(1 << self.n, dtype=np.int64)
+        for i in range(self.n):
+            sizes += (masks >> i) & 1
+        sizes.flags.writeable = False
+        return sizes
+
+    @cached_property
+    def contains(self) -> np.ndarray:
+        contains = (np.arange(1 << self.n)[np.newaxis, :] >> np.arange(self.n)[:, np.newaxis] & 1).astype(bool)
+        contains.flags.writeable = False
+        return contains
+
+
+@lru_cache(maxsize=LANGUAGE_TABLES_CACHE_SIZE)
+def language_tables(n: int) -> LanguageTables:
+    """ This gives the shared LanguageTables of a language of n sentences, keeping the most recently used ones """
+    return LanguageTables(n)
@@ -1,7 +1,8 @@
-import math
 import random
 import numpy as np
-from utils.utils import list_powerset_, powerset
+from utils.utils import powerset
+from utils.bitmask_utils import set_to_mask
+from utils.language_tables import language_tables
 
 
 def possible_imp_generator(language: list) -> frozenset:
@@ -21,16 +22,11 @@ def possible_imp_generator(language: list) -> frozenset:
         frozenset set of implications, each implication is a tuple, whose first element is a frozenset of integers and
         second element an integer
     """
-    result = []
-    lst = [i for i in range(len(language))]
-    for i in list_powerset_(lst):
-        for j in range(len(language)):
-            result.append((frozenset(i), j))
-    return frozenset(result)
+    return language_tables(len(language)).possible_imp
 
 
 def possible_non_co_imp_generator(language: list) -> frozenset:
-    return possible_imp_generator(language = language) - co_generator(language = language)
+    return language_tables(len(language)).possible_non_co_imp
 
 
 def possible_inc_generator(language: list) -> frozenset:
@@ -49,19 +45,12 @@ def possible_inc_generator(language: list) -> frozenset:
         a frozenset set of sets of integers. It contains all subsets of the (indexes of the) enumerated language, except
         all singletons, since we assume singletons are always coherent.
     """
-    lst = [i for i in range(len(language))]
-    result = list_powerset_(lst) - frozenset([frozenset([i]) for i in lst])
-    return result
+    return language_tables(len(language)).possible_inc
 
 
 def co_generator(language: list) -> frozenset:
     # This function generates the list of implications required by CO for any atomic language
-    result = []
-    lst = [i for i in range(len(language))]
-    for i in list_powerset_(lst):
-        for j in i:
-            result.append((frozenset(i), j))
-    return frozenset(result)
+    return language_tables(len(language)).co
 
 
 def co_checker(language: list, imp: frozenset):
@@ -135,17 +124,154 @@ def random_inc(language: list, size = 'random', chance = 0.5) -> frozenset:
         return frozenset.union(result, frozenset([frozenset(lst)]))
 
 
+def superset_sums(values: np.ndarray, n: int) -> np.ndarray:
+    """
+    The superset-sum (zeta) transform over the subsets of a language of n sentences, where subsets are indexed by their
+    masks (see utils.bitmask_utils). It takes O(n * 2^n) time, one vectorized addition per sentence.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        An array whose last axis has length 2^n, values[..., m] being the value of the subset with mask m. Any leading
+        axes are batch axes, transformed independently.
+    n : int
+        The length of the enumerated language.
+
+    Returns
+    -------
+    np.ndarray
+        An array of the shape of values, whose entry at mask m is the sum of values over all supersets of m.
+    """
+    result = np.array(values, dtype=np.int64)
+    for i in range(n):
+        # Viewing the last axis as (high bits, bit i, low bits) pairs each mask without sentence i with the mask that
+        # additionally contains sentence i.
+        view = result.reshape(result.shape[:-1] + (-1, 2, 1 << i))
+        view[..., 0, :] += view[..., 1, :]
+    return result
+
+
+def mask_sizes(n: int) -> np.ndarray:
+    """ This gives a read-only array of length 2^n, whose entry at mask m is the number of sentences in m """
+    return language_tables(n).mask_sizes
+
+
+def exff_mask_array(n: int, inc: np.ndarray) -> np.ndarray:
+    """
+    Find the persistently incoherent sets among all subsets of a language of n sentences.
+    A set is persistently incoherent iff all of its 2^(n - |set|) supersets, itself included, are incoherent. So we
+    count the incoherent supersets of every mask with superset_sums and compare.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+    inc : np.ndarray
+        A boolean array whose last axis has length 2^n, inc[..., m] is True iff the subset with mask m is incoherent.
+        Any leading axes are batch axes.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean array of the shape of inc, whose entry at mask m is True iff the subset with mask m is persistently
+        incoherent.
+    """
+    counts = superset_sums(inc, n)
+    return counts == np.left_shift(1, n - mask_sizes(n))
+
+
+def contains_array(n: int) -> np.ndarray:
+    """ This gives a read-only boolean array of shape (n, 2^n), whose entry at (c, m) is True iff the sentence c is in
+    mask m """
+    return language_tables(n).contains
+
+
+def _random_flags(candidates: np.ndarray, n_samples: int, size, chance) -> np.ndarray:
+    # Draws, for each of n_samples samples, a subset of the positions flagged in candidates: either each position
+    # independently with probability chance, or exactly size positions uniformly. The former has the same
+    # distribution as drawing the size from a binomial distribution and then sampling that many positions.
+    shape = (n_samples,) + candidates.shape
+    if size == 'random':
+        return (np.random.random_sample(shape) < chance) & candidates
+    result = np.zeros((n_samples, candidates.size), dtype=bool)
+    flat = np.flatnonzero(candidates)
+    for i in range(n_samples):
+        result[i, np.random.choice(flat, size, replace=False)] = True
+    return result.reshape(shape)
+
+
+def random_inc_array(n: int, n_samples: int = 1, size = 'random', chance = 0.5) -> np.ndarray:
+    """
+    The array version of random_inc, sampling n_samples sets of incoherent sets at once with NumPy, directly over the
+    2^n masks of a language of n sentences.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+    n_samples : int
+        The number of samples.
+    size : 'random' or int
+        As in random_inc.
+    chance : float
+        As in random_inc.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean array of shape (n_samples, 2^n), whose entry at (k, m) is True iff the subset with mask m is
+        incoherent in the k-th sample. The entire language is always incoherent, and neither the empty set nor any
+        singleton is.
+    """
+    full = (1 << n) - 1
+    candidates = mask_sizes(n) > 1
+    if size == 'random':
+        result = _random_flags(candidates, n_samples, size, chance)
+    else:
+        candidates[full] = False
+        result = _random_flags(candidates, n_samples, size - 1, chance)
+    result[:, full] = True
+    return result
+
+
+def random_imp_co_exff_array(n: int, inc: np.ndarray, size = 'random', chance = 0.5) -> np.ndarray:
+    """
+    The array version of random_imp_co_exff, sampling one set of implications for each set of incoherent sets in inc,
+    directly over the n conclusions times 2^n premise masks. CO and exff closures are taken as boolean operations.
+
+    Parameters
+    ----------
+    n : int
+        The length of the enumerated language.
+    inc : np.ndarray
+        A boolean array of shape (n_samples, 2^n), as returned by random_inc_array.
+    size : 'random' or int
+        As imp_size in random_imp_co_exff.
+    chance : float
+        As imp_chance in random_imp_co_exff.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean array of shape (n_samples, n, 2^n), whose entry at (k, c, m) is True iff the premises with mask m
+        imply the sentence c in the k-th sample.
+    """
+    contains = contains_array(n)
+    # As in possible_imp_generator, premises are never empty.
+    candidates = ~contains
+    candidates[:, 0] = False
+    result = _random_flags(candidates, len(inc), size, chance)
+    return result | contains | exff_mask_array(n, inc)[:, np.newaxis, :]
+
+
 def exff_sets(language: list, inc: frozenset) -> frozenset:
-    exff_sets = []
-    for gamma in inc:
-        if math.pow(2, (len(language) - len(gamma))) <= len(inc):
-            n = 0
-            for delta in inc:
-                if gamma.issubset(delta):
-                    n = n + 1
-            if n >= math.pow(2, (len(language) - len(gamma))):
-                exff_sets.append(gamma)
-    return frozenset(exff_sets)
+    # This generates the set of persistently incoherent sets in inc, i.e. those sets all of whose supersets are in inc.
+    n = len(language)
+    masks = [set_to_mask(gamma) for gamma in inc]
+    indicator = np.zeros(1 << n, dtype=bool)
+    indicator[masks] = True
+    exff = exff_mask_array(n, indicator)
+    return frozenset([gamma for gamma, m in zip(inc, masks) if exff[m]])
 
 
 def exff_closure(language: list, imp: frozenset, inc: frozenset) -> frozenset:
@@ -159,18 +285,8 @@ def exff_generator(language: list, inc: frozenset) -> frozenset:
     # under exff. Perhaps, more requirements can be generated in the process of adding. That is not the case.
     # The process of adding doesn't change inc. It only changes imp. So adding this generated set to a given imp,
     # does make that imp closed under exff relative to a inc.
-    exff_sets = []
     result = []
-    for gamma in inc:
-        if math.pow(2, (len(language) - len(gamma))) <= len(inc):
-            n = 0
-            for delta in inc:
-                if gamma.issubset(delta):
-                    n = n + 1
-            if n >= math.pow(2, (len(language) - len(gamma))):
-                exff_sets.append(gamma)
-
-    for gamma in exff_sets:
+    for gamma in exff_sets(language, inc):
         for i in range(len(language)):
             result.append((gamma, i))
     return frozenset(result)